@@ -0,0 +1,101 @@
+"""
+HTTP conditional request helpers
+Strong ETags derived from the catalog version and the request, plus Last-Modified handling
+"""
+
+import hashlib
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlencode
+
+from fastapi import Request, Response
+
+
+def make_etag(version: str, request: Request) -> str:
+    """
+    Strong ETag for a response that is a pure function of the catalog version
+    and the request path + query. Query parameters are sorted so that
+    equivalent URLs share a validator.
+    """
+    query = urlencode(sorted(request.query_params.multi_items()))
+    h = hashlib.sha1(f"{version}|{request.url.path}|{query}".encode("utf-8")).hexdigest()
+    return f'"{h[:32]}"'
+
+
+def body_etag(body: bytes) -> str:
+    """
+    Strong ETag from the response bytes, for bodies that depend on more
+    than the catalog version (e.g. Storage API variant data).
+    """
+    return f'"{hashlib.sha1(body).hexdigest()[:32]}"'
+
+
+# Content codings that get their own ETag suffix (see encoded_etag)
+ETAG_CODINGS = ("gzip", "br")
+
+
+def encoded_etag(etag: str, coding: str) -> str:
+    """
+    ETag of a content-coded variant: '"abc"' -> '"abc-gzip"'.
+
+    A strong validator must differ between the identity and the compressed
+    bytes; the suffix is stripped again when comparing If-None-Match.
+    """
+    if etag.startswith("W/") or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{coding}"'
+
+
+def _strip_coding(tag: str) -> str:
+    for coding in ETAG_CODINGS:
+        suffix = f'-{coding}"'
+        if tag.endswith(suffix):
+            return tag[: -len(suffix)] + '"'
+    return tag
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison, so W/"x" matches "x"; any coded variant matches its identity tag
+    candidates = [_strip_coding(tag.strip().removeprefix("W/")) for tag in header.split(",")]
+    return etag in candidates
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """
+    304 response if the client's validators are still current, else None.
+
+    If-None-Match takes precedence; If-Modified-Since is only consulted when
+    no entity tag was sent (RFC 9110, 13.1.3), and only for responses that
+    have a Last-Modified date.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        fresh = _etag_matches(if_none_match, etag)
+    else:
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since is None or last_modified is None:
+            return None
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return None
+        # HTTP dates have second precision
+        fresh = since.tzinfo is not None and last_modified.replace(microsecond=0) <= since
+    if not fresh:
+        return None
+    return Response(status_code=304, headers=cache_headers(etag, last_modified))
+
+
+def apply_cache_headers(response: Response, etag: str, last_modified: datetime) -> Response:
+    response.headers.update(cache_headers(etag, last_modified))
+    return response
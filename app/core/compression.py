@@ -0,0 +1,249 @@
+"""
+Response compression
+gzip/brotli negotiation, a middleware for dynamic responses and precompressed bodies for snapshot-backed ones
+"""
+
+import gzip
+import os
+import threading
+import zlib
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .caching import encoded_etag
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional, gzip only without it
+    brotli = None
+
+
+# Bodies smaller than this are sent uncompressed
+MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+
+# Levels for responses compressed per request; kept low because they cost request time
+GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+
+# Precompressed bodies are encoded once per snapshot, so they use the highest levels
+PRECOMPRESS_GZIP_LEVEL = 9
+PRECOMPRESS_BROTLI_QUALITY = 11
+
+# In order of preference when the client accepts several with equal q-value
+ENCODINGS: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Best supported content coding for an Accept-Encoding header, or None for identity.
+
+    Honours q-values (q=0 refuses a coding) and the "*" wildcard.
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        weights[name] = q
+    best, best_q = None, 0.0
+    for coding in ENCODINGS:
+        q = weights.get(coding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, precompress: bool = False) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=PRECOMPRESS_BROTLI_QUALITY if precompress else BROTLI_QUALITY)
+    # mtime=0 keeps the output (and thus its ETag) deterministic
+    return gzip.compress(body, compresslevel=PRECOMPRESS_GZIP_LEVEL if precompress else GZIP_LEVEL, mtime=0)
+
+
+class PrecompressedBodies:
+    """
+    Encoded response bodies belonging to one catalog snapshot.
+
+    Bodies are keyed by a fixed response name (e.g. "facets") and content
+    coding, rendered and compressed at most once per snapshot, and dropped
+    together with the snapshot on reload.
+    """
+
+    def __init__(self):
+        self._bodies: Dict[Tuple[str, str], bytes] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(body) for body in self._bodies.values())
+
+    def get(self, key: str, encoding: Optional[str], render: Callable[[], bytes]) -> bytes:
+        coding = encoding or "identity"
+        body = self._bodies.get((key, coding))
+        if body is not None:
+            return body
+        with self._lock:
+            body = self._bodies.get((key, coding))
+            if body is None:
+                if coding == "identity":
+                    body = render()
+                else:
+                    body = compress(self.get(key, None, render), coding, precompress=True)
+                self._bodies[(key, coding)] = body
+        return body
+
+    def warm(self, key: str, render: Callable[[], bytes]) -> None:
+        """Render and compress `key` in every supported coding ahead of the first request."""
+        body = self.get(key, None, render)
+        if len(body) >= MIN_SIZE:
+            for coding in ENCODINGS:
+                self.get(key, coding, render)
+
+
+def precompressed_response(
+    request: Request,
+    bodies: PrecompressedBodies,
+    key: str,
+    render: Callable[[], bytes],
+    headers: Optional[Mapping[str, str]] = None,
+    media_type: str = "application/json",
+) -> Response:
+    """
+    Response for a snapshot-backed body in the best coding the client accepts.
+
+    Bodies below MIN_SIZE are sent as identity unless they have an ETag
+    (see CompressionMiddleware). The ETag of a compressed variant carries
+    the coding as a suffix.
+    """
+    response_headers = dict(headers or {})
+    body = bodies.get(key, None, render)
+    if len(body) >= MIN_SIZE or "ETag" in response_headers:
+        response_headers["Vary"] = "Accept-Encoding"
+        encoding = negotiate(request.headers.get("accept-encoding"))
+        if encoding is not None:
+            body = bodies.get(key, encoding, render)
+            response_headers["Content-Encoding"] = encoding
+            if "ETag" in response_headers:
+                response_headers["ETag"] = encoded_etag(response_headers["ETag"], encoding)
+    return Response(content=body, media_type=media_type, headers=response_headers)
+
+
+class _StreamCompressor:
+    """Incremental gzip/brotli encoder; every chunk is flushed so streamed responses stay live."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self._zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def feed(self, data: bytes, final: bool = False) -> bytes:
+        if self.encoding == "br":
+            out = self._brotli.process(data)
+            return out + (self._brotli.finish() if final else self._brotli.flush())
+        out = self._zlib.compress(data)
+        return out + self._zlib.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class CompressionMiddleware:
+    """
+    Compresses dynamic responses with the coding negotiated from Accept-Encoding.
+
+    Responses that already carry Content-Encoding (precompressed bodies) and
+    complete bodies below MIN_SIZE without an ETag pass through untouched.
+    Streamed responses are compressed chunk by chunk. A 304 gets the coded
+    ETag the 200 would have carried.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[_StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if message["type"] == "http.response.start":
+                if message["status"] == 304:
+                    # No body to compress, but the validator must match the one the coded 200 carried
+                    headers = MutableHeaders(raw=message["headers"])
+                    if "etag" in headers:
+                        headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                    headers.add_vary_header("Accept-Encoding")
+                    passthrough = True
+                    await send(message)
+                    return
+                start = message
+                passthrough = "content-encoding" in Headers(raw=message["headers"])
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if passthrough:
+                if start is not None:
+                    await send(start)
+                    start = None
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                # Bodies with an ETag are coded regardless of size, so a later 304 knows which tag to send
+                small = len(body) < self.minimum_size and "etag" not in Headers(raw=start["headers"])
+                if not more_body and small:
+                    passthrough = True
+                    await send(start)
+                    start = None
+                    await send(message)
+                    return
+                headers = MutableHeaders(raw=start["headers"])
+                headers["Content-Encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                if "etag" in headers:
+                    headers["ETag"] = encoded_etag(headers["etag"], encoding)
+                compressor = _StreamCompressor(encoding)
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = compressor.feed(body, final=True)
+                    headers["Content-Length"] = str(len(body))
+                    await send(start)
+                    start = None
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                await send(start)
+                start = None
+            await send({
+                "type": "http.response.body",
+                "body": compressor.feed(body, final=not more_body),
+                "more_body": more_body,
+            })
+
+        await self.app(scope, receive, send_compressed)
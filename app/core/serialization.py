@@ -0,0 +1,26 @@
+"""
+Fast JSON encoding for pre-rendered responses
+Uses orjson when installed and falls back to ujson (see requirements.txt)
+"""
+
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+import ujson
+
+
+def dumps_bytes(obj: Any) -> bytes:
+    """
+    Encode plain JSON data (as produced by model_dump(mode="json")) to UTF-8 bytes.
+
+    Output matches FastAPI's JSONResponse: compact separators, non-ASCII
+    characters and forward slashes left unescaped. Non-string dict keys
+    (e.g. season counts) become strings, as with jsonable_encoder.
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+    return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode("utf-8")
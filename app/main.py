@@ -1,9 +1,39 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from .core.compression import CompressionMiddleware
 from .routers import products, facets, ping, categories, category_media
+from .services.catalog import catalog
+from .services.product_source import product_source_client
+from .services.storage_client import storage_client
+from .services.variant_prefetch import PREFETCH_ENABLED, variant_prefetcher
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Build the catalog snapshot before serving so no request pays the parse cost
+    catalog.load()
+    watcher = asyncio.create_task(catalog.watch())
+    # One pooled Storage API client for the whole process, so connections are reused
+    await storage_client.start()
+    await product_source_client.start()
+    # Resolve media variants off the request path, on every catalog version and on a schedule
+    tasks = [watcher]
+    if PREFETCH_ENABLED:
+        tasks.append(asyncio.create_task(variant_prefetcher.run()))
+    yield
+    for task in tasks:
+        task.cancel()
+    for task in tasks:
+        with suppress(asyncio.CancelledError):
+            await task
+    await storage_client.aclose()
+    await product_source_client.aclose()
 
 
-app = FastAPI(title="O’Neal Product API", version="1.0")
+app = FastAPI(title="O’Neal Product API", version="1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,6 +41,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# gzip/brotli for dynamic responses; precompressed snapshot bodies pass through
+app.add_middleware(CompressionMiddleware)
 
 app.include_router(ping.router, prefix="/v1", tags=["health"])
 app.include_router(products.router, prefix="/v1", tags=["products"])
@@ -119,6 +119,7 @@ class Product(BaseModel):
 class ProductListResponse(BaseModel):
     count: int
     results: List[Product]
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page; absent on the last page")
 
 
 class FigmaFeedItem(BaseModel):
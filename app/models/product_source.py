@@ -38,3 +38,17 @@ class ProductSourceResponse(BaseModel):
     collections: List[str] = Field(default_factory=list)
     taxonomy: ProductSourceTaxonomy = Field(default_factory=ProductSourceTaxonomy)
     raw_schema: Optional[dict] = Field(None, description="Raw schema.org Product JSON extracted from the page")
+
+
+class ProductSourceBatchRequest(BaseModel):
+    product_ids: List[str] = Field(default_factory=list, description="Internal product IDs")
+    product_urls: List[str] = Field(default_factory=list, description="Direct product URLs on oneal.eu")
+
+
+class ProductSourceBatchItem(BaseModel):
+    """One NDJSON line of the batch response: the requested product and its result or error."""
+    product_id: Optional[str] = None
+    product_url: Optional[str] = None
+    status: int = Field(200, description="HTTP status the single source-info request would have returned")
+    result: Optional[ProductSourceResponse] = None
+    error: Optional[str] = None
@@ -97,3 +97,4 @@ class ResolvedProductsResponse(BaseModel):
     limit: int = 50
     offset: int = 0
     results: List[ProductResolved]
+    next_cursor: Optional[str] = Field(None, description="Opaque cursor for the next page; absent on the last page")
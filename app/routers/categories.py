@@ -1,14 +1,14 @@
-from fastapi import APIRouter
-from pathlib import Path
-import json
+from fastapi import APIRouter, Request
 from typing import List, Dict, Any, Optional
+from ..core.caching import cache_headers, make_etag, not_modified
+from ..core.compression import precompressed_response
+from ..core.serialization import dumps_bytes
 from ..models.category import Category, CategoryListResponse
+from ..services.catalog import catalog
 
 
 router = APIRouter()
 
-DATA_FILE = Path(__file__).resolve().parents[2] / "app" / "data" / "kategorien.json"
-
 
 def _slug_from_url(url: str) -> str:
     if not url:
@@ -35,19 +35,27 @@ def _assign_ids(node: Dict[str, Any], parent_id: Optional[str], path_slugs: List
         _assign_ids(child, cat_id, current_path, out)
 
 
-def _load_categories() -> List[Category]:
-    if not DATA_FILE.exists():
-        return []
-    raw = json.loads(DATA_FILE.read_text("utf-8"))
+def _load_categories(taxonomy: Dict[str, Any]) -> List[Category]:
     results: List[Category] = []
-    for root in raw.get("taxonomy", []):
+    for root in taxonomy.get("taxonomy", []):
         _assign_ids(root, None, [], results)
     return results
 
 
 @router.get("/categories", response_model=CategoryListResponse)
-def list_categories():
-    cats = _load_categories()
-    return CategoryListResponse(count=len(cats), results=cats)
+def list_categories(request: Request):
+    snapshot = catalog.get()
+    etag = make_etag(snapshot.digest, request)
+    cached = not_modified(request, etag, snapshot.last_modified)
+    if cached is not None:
+        return cached
+
+    def render() -> bytes:
+        cats = _load_categories(snapshot.taxonomy)
+        return dumps_bytes(CategoryListResponse(count=len(cats), results=cats).model_dump(mode="json"))
+
+    return precompressed_response(
+        request, snapshot.encoded, "categories", render, cache_headers(etag, snapshot.last_modified)
+    )
 
 
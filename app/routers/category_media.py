@@ -4,22 +4,23 @@ Category Media Router
 Provides endpoints for category and dimension media assets (hero images, backgrounds, etc.)
 """
 
-from fastapi import APIRouter, Depends, Query
-from pathlib import Path
-import json
+from fastapi import APIRouter, Depends, Query, Request, Response
 from typing import Optional, List
 
 from ..core.auth import api_key_auth
+from ..core.caching import apply_cache_headers, cache_headers, make_etag, not_modified
+from ..core.compression import precompressed_response
+from ..core.serialization import dumps_bytes
 from ..models.category_media import CategoryMediaCollection, CategoryMedia
+from ..services.catalog import catalog
 
 router = APIRouter()
 
-# Path to category media data file
-DATA_FILE = Path(__file__).resolve().parents[2] / "app" / "data" / "category-media.json"
-
 
 @router.get("/", response_model=CategoryMediaCollection, dependencies=[Depends(api_key_auth)])
 async def get_category_media(
+    request: Request,
+    response: Response,
     dimension: Optional[str] = Query(None, description="Filter by dimension (e.g., 'category:presentation')"),
     dimension_value: Optional[str] = Query(None, description="Filter by dimension value (e.g., 'Helme')"),
     role: Optional[str] = Query(None, description="Filter by role (hero, background, thumbnail)")
@@ -29,8 +30,24 @@ async def get_category_media(
 
     Returns all media assets or filtered subset based on query parameters.
     """
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    snapshot = catalog.get()
+    etag = make_etag(snapshot.digest, request)
+    cached = not_modified(request, etag, snapshot.last_modified)
+    if cached is not None:
+        return cached
+
+    if not (dimension or dimension_value or role):
+        return precompressed_response(
+            request,
+            snapshot.encoded,
+            "category-media",
+            lambda: dumps_bytes(CategoryMediaCollection(**snapshot.category_media).model_dump(mode="json")),
+            cache_headers(etag, snapshot.last_modified),
+        )
+    apply_cache_headers(response, etag, snapshot.last_modified)
+
+    # Shallow copy: the snapshot's data is shared between requests
+    data = dict(snapshot.category_media)
 
     # Apply filters if provided
     if dimension or dimension_value or role:
@@ -51,6 +68,8 @@ async def get_category_media(
 
 @router.get("/lookup", response_model=CategoryMedia, dependencies=[Depends(api_key_auth)])
 async def lookup_category_media(
+    request: Request,
+    response: Response,
     dimension: str = Query(..., description="Dimension (e.g., 'category:presentation')"),
     dimension_value: str = Query(..., description="Dimension value (e.g., 'Helme')")
 ):
@@ -61,8 +80,14 @@ async def lookup_category_media(
     """
     from fastapi import HTTPException
 
-    with open(DATA_FILE, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    snapshot = catalog.get()
+    etag = make_etag(snapshot.digest, request)
+    cached = not_modified(request, etag, snapshot.last_modified)
+    if cached is not None:
+        return cached
+    apply_cache_headers(response, etag, snapshot.last_modified)
+
+    data = snapshot.category_media
 
     # Find matching media
     for media in data['media']:
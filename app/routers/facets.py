@@ -1,47 +1,103 @@
-from typing import List, Dict, Any
-from fastapi import APIRouter, Depends
+from typing import Dict, Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from ..core.auth import api_key_auth
-from ..models.product import Product
-from pathlib import Path
-import json
+from ..core.caching import apply_cache_headers, cache_headers, make_etag, not_modified
+from ..core.compression import precompressed_response
+from ..core.serialization import dumps_bytes
+from ..services.catalog import catalog
+from ..services.catalog_columns import positions_mask
+from ..services.catalog_index import FACET_FIELDS, build_facets, filter_terms
 
 router = APIRouter()
 
-DATA_FILE = Path(__file__).resolve().parents[2] / "app" / "data" / "products.json"
 
-
-def load_products() -> List[Product]:
-    if not DATA_FILE.exists():
-        return []
-    with DATA_FILE.open("r", encoding="utf-8") as f:
-        raw = json.load(f)
-    return [Product(**p) for p in raw]
+def _parse_floats(raw: str, name: str) -> List[float]:
+    try:
+        return [float(v) for v in raw.split(",") if v.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{name} must be a comma-separated list of numbers")
 
 
 @router.get("/facets")
-async def get_facets(_: None = Depends(api_key_auth)) -> Dict[str, Any]:
-    products = load_products()
-    categories = set()
-    seasons = set()
-    certs = set()
-    min_price = None
-    max_price = None
-
-    for p in products:
-        for c in p.category or []:
-            categories.add(c)
-        if p.season is not None:
-            seasons.add(p.season)
-        for ce in p.certifications or []:
-            certs.add(ce)
-        if p.price and p.price.value is not None:
-            v = p.price.value
-            min_price = v if min_price is None or v < min_price else min_price
-            max_price = v if max_price is None or v > max_price else max_price
-
-    return {
-        "category": sorted(categories),
-        "season": sorted(seasons),
-        "certification": sorted(certs),
-        "priceRange": {"min": min_price or 0, "max": max_price or 0},
-    }
+async def get_facets(
+    request: Request,
+    response: Response,
+    search: Optional[str] = Query(default=None),
+    category: Optional[str] = Query(default=None),
+    category_id: Optional[str] = Query(default=None),
+    season: Optional[int] = Query(default=None),
+    cert: Optional[str] = Query(default=None),
+    status: Optional[str] = Query(default=None),
+    tier: Optional[str] = Query(default=None),
+    series_id: Optional[str] = Query(default=None),
+    price_min: Optional[float] = Query(default=None),
+    price_max: Optional[float] = Query(default=None),
+    price_buckets: Optional[int] = Query(default=None, ge=1, le=200, description="Add a price histogram with this many equal-width buckets"),
+    price_edges: Optional[str] = Query(default=None, description="Add a price histogram with explicit bucket edges, e.g. 0,50,100,250"),
+    percentiles: Optional[str] = Query(default=None, description="Add price percentiles, e.g. 25,50,75"),
+    _: None = Depends(api_key_auth),
+) -> Dict[str, Any]:
+    """
+    Facet values with product counts.
+
+    Accepts the same filters as /v1/products. Each facet's counts apply all
+    filters except the facet's own, so the counts show how many products a
+    click on that value would return.
+
+    The optional price histogram and percentiles, like priceRange, cover the
+    products matching every filter except the price range.
+    """
+    edges = _parse_floats(price_edges, "price_edges") if price_edges else None
+    if edges is not None and (len(edges) < 2 or any(b <= a for a, b in zip(edges, edges[1:]))):
+        raise HTTPException(status_code=400, detail="price_edges needs at least two strictly increasing values")
+    quantiles = _parse_floats(percentiles, "percentiles") if percentiles else None
+    if quantiles is not None and any(not 0 <= q <= 100 for q in quantiles):
+        raise HTTPException(status_code=400, detail="percentiles must be between 0 and 100")
+
+    snapshot = catalog.get()
+    etag = make_etag(snapshot.digest, request)
+    cached = not_modified(request, etag, snapshot.last_modified)
+    if cached is not None:
+        return cached
+
+    terms = filter_terms(category, category_id, season, cert, status, tier, series_id)
+    has_price = price_min is not None or price_max is not None
+    wants_distribution = price_buckets is not None or edges is not None or quantiles is not None
+    unfiltered = not search and not has_price and all(v is None for v in terms.values())
+    if unfiltered and not wants_distribution:
+        return precompressed_response(
+            request,
+            snapshot.encoded,
+            "facets",
+            lambda: dumps_bytes(snapshot.facets),
+            cache_headers(etag, snapshot.last_modified),
+        )
+    apply_cache_headers(response, etag, snapshot.last_modified)
+
+    hits = positions_mask(snapshot.search.search(search), len(snapshot.products)) if search else None
+
+    def select_without(field: Optional[str] = None, price: bool = True):
+        mask = snapshot.columns.select(
+            {k: v for k, v in terms.items() if k != field},
+            price_min=price_min if price else None,
+            price_max=price_max if price else None,
+        )
+        if hits is None:
+            return mask
+        return hits if mask is None else mask & hits
+
+    if unfiltered:
+        facets = dict(snapshot.facets)
+        price_selection = None
+    else:
+        selections = {name: select_without(field) for name, field in FACET_FIELDS.items()}
+        selections["price"] = price_selection = select_without(price=False)
+        facets = build_facets(snapshot.columns, selections, select_without())
+
+    if price_buckets is not None or edges is not None:
+        facets["priceHistogram"] = snapshot.columns.price_histogram(
+            price_selection, buckets=price_buckets or 10, edges=edges
+        )
+    if quantiles is not None:
+        facets["pricePercentiles"] = snapshot.columns.price_percentiles(price_selection, quantiles)
+    return facets
@@ -1,14 +1,26 @@
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends
 from ..core.auth import api_key_auth
+from ..services.catalog import catalog
+from ..services.product_source import product_source_client
+from ..services.storage_client import storage_client
+from ..services.variant_prefetch import variant_prefetcher
 
 router = APIRouter()
 
 
 @router.get("/ping")
 async def ping(_: None = Depends(api_key_auth)):
+    snapshot = catalog.get()
     return {
         "status": "ok",
         "version": "1.0",
         "time": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+        "catalog": {
+            "version": snapshot.version,
+            "loaded_at": snapshot.loaded_at.isoformat().replace("+00:00", "Z"),
+            "products": len(snapshot.products),
+        },
+        "storage": {**storage_client.stats(), "prefetch": variant_prefetcher.stats()},
+        "product_source": product_source_client.stats(),
     }
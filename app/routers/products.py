@@ -1,401 +1,159 @@
-from typing import List, Optional, Dict, Any
+from typing import Callable, Dict, List, Optional, Tuple
 from urllib.parse import urljoin
+import base64
+import binascii
+import json
+
+import numpy as np
 
-from fastapi import APIRouter, Depends, Query, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Depends, Query, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
 from ..core.auth import api_key_auth
+from ..core.caching import body_etag, cache_headers, make_etag, not_modified
+from ..core.compression import precompressed_response
+from ..core.serialization import dumps_bytes
 from ..models.product import Product, ProductListResponse
-from ..models.product_source import ProductSourceResponse
-from ..models.resolved import (
-    ResolvedProductsResponse,
-    ProductResolved,
-    MediaCollection,
-    MediaAsset,
-    ImageVariants,
-    VideoVariants,
-    PriceResolved,
-    LayoutHints,
-)
+from ..models.product_source import ProductSourceBatchItem, ProductSourceBatchRequest, ProductSourceResponse
+from ..models.resolved import ResolvedProductsResponse, ProductResolved
+from ..services.catalog import catalog
+from ..services.catalog_index import filter_terms, mask_count
+from ..services.resolved_projection import resolved_json, resolved_queries
 from ..services.storage_client import storage_client
-from ..services.product_source import fetch_product_source
+from ..services.product_source import fetch_product_source_async, product_source_client
 from ..data.test_products import TEST_PRODUCTS
-from pathlib import Path
-import hashlib
-import json
 
 router = APIRouter()
 
 # Set to True to return test data instead of real products
 TEST_MODE = False  # Use products.json with new OpenAPI-compliant format
 
-DATA_FILE = Path(__file__).resolve().parents[2] / "app" / "data" / "products.json"
-CAT_FILE = Path(__file__).resolve().parents[2] / "app" / "data" / "kategorien.json"
-
-ROOT_LABEL_BY_SOURCE = {
-    "mtb": "Mountainbike",
-    "mx": "Motocross",
-}
-
-CATEGORY_LABEL_MAP = {
-    "mtb": "Mountainbike",
-    "mx": "Motocross",
-    "helmets": "Helme",
-    "clothing": "Kleidung",
-    "gloves": "Handschuhe",
-    "protectors": "Protektoren",
-    "shoes": "Schuhe",
-    "accessories": "Accessories",
-    "other": "Weitere",
-}
-
-ROOT_LABELS = set(ROOT_LABEL_BY_SOURCE.values())
-
-CATEGORY_PATH_OVERRIDES = {
-    ("Mountainbike", "Helme"): ["Mountainbike", "Helme"],
-    ("Mountainbike", "Kleidung"): ["Mountainbike", "Kleidung"],
-    ("Mountainbike", "Handschuhe"): ["Mountainbike", "Kleidung", "Handschuhe"],
-    ("Mountainbike", "Protektoren"): ["Mountainbike", "Protektoren"],
-    ("Mountainbike", "Schuhe"): ["Mountainbike", "Schuhe"],
-    ("Mountainbike", "Accessories"): ["Mountainbike", "Accessories"],
-    ("Mountainbike", "Weitere"): ["Mountainbike", "Protektoren", "Weitere"],
-    ("Motocross", "Helme"): ["Motocross", "Helme"],
-    ("Motocross", "Kleidung"): ["Motocross", "Kleidung"],
-    ("Motocross", "Handschuhe"): ["Motocross", "Kleidung", "Handschuhe"],
-    ("Motocross", "Protektoren"): ["Motocross", "Protektoren"],
-    ("Motocross", "Schuhe"): ["Motocross", "Stiefel"],
-    ("Motocross", "Accessories"): ["Motocross", "Accessories"],
-    ("Motocross", "Weitere"): ["Motocross", "Protektoren", "Weitere"],
-}
-
-
-def _stable_float(seed: str, min_val: float, max_val: float) -> float:
-    """Deterministic pseudo-random float in [min_val, max_val] from a string seed."""
-    h = hashlib.md5(seed.encode("utf-8")).hexdigest()
-    # Use 8 hex chars -> 32-bit int
-    n = int(h[:8], 16)
-    r = n / 0xFFFFFFFF
-    return min_val + (max_val - min_val) * r
-
-
-def _normalize_product_dict(p: dict) -> dict:
-    """Ensure price and weight exist for test data. Does not mutate input dict."""
-    product = dict(p)
-    cat_list = product.get("category") or []
-    cat0 = (cat_list[0] if isinstance(cat_list, list) and cat_list else "Other").lower()
-
-    # Category-based ranges (rough, for demo data)
-    price_ranges = {
-        "helmets": (79.0, 449.0),
-        "gloves": (9.0, 59.0),
-        "clothing": (19.0, 299.0),
-        "protectors": (19.0, 199.0),
-        "shoes": (49.0, 299.0),
-        "boots": (49.0, 299.0),
-        "accessories": (5.0, 99.0),
-        "other": (10.0, 199.0),
-    }
-    weight_ranges_g = {
-        "helmets": (900.0, 1800.0),
-        "gloves": (80.0, 300.0),
-        "clothing": (200.0, 1500.0),
-        "protectors": (200.0, 1500.0),
-        "shoes": (800.0, 2500.0),
-        "boots": (800.0, 2500.0),
-        "accessories": (20.0, 800.0),
-        "other": (100.0, 2000.0),
-    }
-
-    # pick range by prefix matching
-    def _pick_range(mapping: dict) -> tuple[float, float]:
-        for key, rng in mapping.items():
-            if key in cat0:
-                return rng
-        return mapping["other"]
-
-    # Price normalization
-    price = product.get("price") or {}
-    price_value = price.get("value")
-    price_currency = price.get("currency") or "EUR"
-    if price_value is None:
-        lo, hi = _pick_range(price_ranges)
-        # Deterministic: id + category
-        seed = f"{product.get('id','')}-{cat0}-price"
-        value = round(_stable_float(seed, lo, hi), 2)
-        price_value = value
-    # formatted string
-    symbol = "€" if price_currency.upper() == "EUR" else price_currency
-    formatted = f"{symbol}{price_value:.2f}"
-    product["price"] = {"currency": price_currency, "value": float(price_value), "formatted": formatted}
-
-    # Weight normalization (grams) in specifications
-    specs = dict(product.get("specifications") or {})
-    weight = specs.get("weight")
-    if weight is None:
-        lo, hi = _pick_range(weight_ranges_g)
-        seed = f"{product.get('id','')}-{cat0}-weight"
-        specs["weight"] = round(_stable_float(seed, lo, hi), 1)
-    product["specifications"] = specs
-
-    return product
-
-
-def _slug_from_url(url: str) -> str:
-    s = (url or "").strip("/")
-    parts = s.split("/")
-    return parts[-1] if parts else s
-
-
-def _load_category_taxonomy() -> Dict[str, Any]:
-    if not CAT_FILE.exists():
-        return {"taxonomy": []}
-    with CAT_FILE.open("r", encoding="utf-8") as f:
-        return json.load(f)
-
-
-def _normalize_category_labels(labels: List[str], source: Optional[str]) -> List[str]:
-    normalized: List[str] = []
-    root_label: Optional[str] = None
-    source_key = (source or "").strip().lower()
-
-    for label in labels or []:
-        canonical = CATEGORY_LABEL_MAP.get(label.strip().lower(), label.strip())
-        if canonical in ROOT_LABELS:
-            root_label = canonical
-        normalized.append(canonical)
-
-    if root_label is None and source_key:
-        root_label = ROOT_LABEL_BY_SOURCE.get(source_key)
-
-    if not root_label:
-        return normalized
-
-    sub_labels = [label for label in normalized if label and label != root_label]
-
-    for sub_label in sub_labels:
-        override = CATEGORY_PATH_OVERRIDES.get((root_label, sub_label))
-        if override:
-            return override
-
-    if sub_labels:
-        return [root_label, *sub_labels]
-
-    return [root_label]
-
-
-def _resolve_category_ids_from_labels(labels: List[str], taxonomy: Dict[str, Any]) -> List[str]:
-    ids: List[str] = []
-    nodes = taxonomy.get("taxonomy", [])
-    path_slugs: List[str] = []
-    for label in labels:
-        match = next((n for n in nodes if (n.get("label") or "").strip().lower() == label.strip().lower()), None)
-        if not match:
-            break
-        slug = _slug_from_url(match.get("url") or match.get("label", "").lower().replace(" ", "-"))
-        if slug:
-            path_slugs.append(slug)
-            ids.append(f"cat:{'/'.join(path_slugs)}")
-        nodes = match.get("children", []) or []
-    return ids
-
-
-def load_products() -> List[Product]:
-    if not DATA_FILE.exists():
-        return []
-    with DATA_FILE.open("r", encoding="utf-8") as f:
-        raw = json.load(f)
-    normalized = [_normalize_product_dict(p) for p in raw]
-    taxonomy = _load_category_taxonomy()
-    enriched: List[Product] = []
-    for p in normalized:
-        if isinstance(p.get("category"), list) and p.get("category") and not p.get("category_ids"):
-            meta = p.get("meta") or {}
-            labels = _normalize_category_labels(p["category"], meta.get("source"))
-            ids = _resolve_category_ids_from_labels(labels, taxonomy) if labels else []
-            if ids:
-                reordered_labels = labels
-                reordered_ids = ids
-                if len(labels) > 1 and len(labels) == len(ids):
-                    root_label, root_id = labels[0], ids[0]
-                    branch_labels = labels[1:]
-                    branch_ids = ids[1:]
-                    primary_label = branch_labels[0]
-                    primary_id = branch_ids[0]
-                    tail_labels = branch_labels[1:]
-                    tail_ids = branch_ids[1:]
-
-                    reordered_labels = [primary_label]
-                    reordered_ids = [primary_id]
-                    if tail_labels:
-                        reordered_labels.extend(tail_labels)
-                        reordered_ids.extend(tail_ids)
-                    reordered_labels.append(root_label)
-                    reordered_ids.append(root_id)
-
-                p["category"] = reordered_labels
-                p["category_ids"] = reordered_ids
-        enriched.append(Product(**p))
-    return enriched
-
-
-async def to_resolved(products: List[Product]) -> List[ProductResolved]:
+# Max products per POST /products/source-info/batch request
+SOURCE_BATCH_MAX = 1000
+# Bytes of product lines per chunk of a streamed NDJSON body
+NDJSON_CHUNK_SIZE = 64 * 1024
+
+
+def _product_response(snapshot, pos: Optional[int]) -> Response:
+    if pos is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return Response(content=snapshot.product_json[pos], media_type="application/json")
+
+
+def _encode_cursor(sort: Optional[str], order: str, key: tuple) -> str:
+    payload = json.dumps({"s": sort or "", "o": order, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _valid_cursor_value(value, sort: Optional[str]) -> bool:
+    """Whether a cursor's sort value has the type the sort compares it against."""
+    if isinstance(value, bool):
+        return False
+    if sort == "name":
+        return isinstance(value, str)
+    if sort in ("price", "season", "relevance"):
+        return isinstance(value, (int, float))
+    # Catalog order: the product's position
+    return isinstance(value, int)
+
+
+def _decode_cursor(cursor: str, sort: Optional[str], order: str) -> tuple:
+    """Return the (sort value, id) key encoded in a cursor issued for the same sort and order."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        state = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        key = tuple(state["k"])
+        valid = len(key) == 2 and isinstance(key[1], str) and _valid_cursor_value(key[0], sort)
+    except (binascii.Error, UnicodeError, ValueError, KeyError, TypeError):
+        valid = False
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if state.get("s") != (sort or "") or state.get("o") != order:
+        raise HTTPException(status_code=400, detail="Cursor was issued for a different sort/order")
+    return key
+
+
+def _ordered_positions(
+    snapshot,
+    selected: Optional[np.ndarray],
+    scores: Optional[Dict[int, float]],
+    sort: Optional[str],
+    order: str,
+    offset: int,
+    window: int,
+    after: Optional[tuple] = None,
+) -> Tuple[List[int], Callable[[int], tuple]]:
     """
-    Convert products to resolved format with resolved media variants.
-    Makes a single batch call to Storage API to resolve all media assets.
+    Positions of `window` selected products after `offset` in the requested
+    order, and the cursor key function for that order.
+
+    Presorted permutations serve name/price/season, score order serves
+    relevance, catalog order everything else.
     """
-    # Step 1: Collect all link_ids from all products
-    queries = []
-    for p in products:
-        if p.media:
-            for m in p.media:
-                queries.append({"link_id": m.id, "role": m.role})
-
-    # Step 2: Batch resolve all media variants from Storage API
-    variants_map = {}
-    if queries:
-        variants_map = await storage_client.get_variants_batch(queries)
-
-    # Step 3: Build ProductFigmaV2 for each product
-    results = []
-    for p in products:
-        # Build price
-        price_resolved = None
-        if p.price and p.price.value is not None:
-            symbol = "€" if (p.price.currency or "EUR").upper() == "EUR" else p.price.currency
-            formatted = f"{symbol}{int(p.price.value) if p.price.value.is_integer() else p.price.value}"
-            price_resolved = PriceResolved(
-                value=p.price.value,
-                currency=p.price.currency or "EUR",
-                formatted=formatted
-            )
-
-        # Build media collection
-        media_collection = MediaCollection()
-        if p.media:
-            for m in p.media:
-                # CHANGED: Use src URL directly from product.media instead of storage_client
-                # For demo/test products with picsum.photos or direct URLs
-                asset_data = variants_map.get(m.id)
-
-                # If storage_client has data, use it (production mode)
-                if asset_data:
-                    # Build variants from storage_client
-                    variants = None
-                    video = None
-                    if asset_data.get("type") == "image":
-                        variants = ImageVariants(
-                            thumb=asset_data.get("variants", {}).get("thumb"),
-                            preview=asset_data.get("variants", {}).get("preview"),
-                            print=asset_data.get("variants", {}).get("print"),
-                        )
-                    elif asset_data.get("type") == "video":
-                        video = VideoVariants(
-                            hls=asset_data.get("video", {}).get("hls"),
-                            posterThumb=asset_data.get("video", {}).get("posterThumb"),
-                            posterPreview=asset_data.get("video", {}).get("posterPreview"),
-                            print=asset_data.get("video", {}).get("print"),
-                        )
-
-                    media_asset = MediaAsset(
-                        link_id=m.id,
-                        role=m.role,
-                        type=asset_data.get("type", "image"),
-                        alt=m.alt,
-                        width=asset_data.get("width"),
-                        height=asset_data.get("height"),
-                        aspectRatio=asset_data.get("aspectRatio"),
-                        variants=variants,
-                        video=video,
-                        original_filename=asset_data.get("original_filename"),
-                        mime_type=asset_data.get("mime_type"),
-                        file_size_bytes=asset_data.get("file_size_bytes"),
-                    )
-                else:
-                    # Fallback: Use Storage API proxy for ALL images (with or without storage_id)
-                    # This enables transformation, caching, and optimization for all external URLs
-                    src_url = str(m.src) if m.src else None
-                    storage_id = getattr(m, 'storage_id', None)
-                    
-                    if storage_id:
-                        # Option 1: Real storage object - use direct media endpoint
-                        base_url = f"https://api-storage.arkturian.com/storage/media/{storage_id}"
-                        thumb_url = f"{base_url}?width=400&format=webp&quality=80"
-                        preview_url = f"{base_url}?width=800&format=webp&quality=85"
-                        print_url = f"{base_url}?width=2000&format=jpg&quality=95"
-                    elif src_url:
-                        # Option 2: External URL - use Storage API proxy endpoint
-                        # This creates a virtual storage object that proxies the external URL
-                        # The Storage API will cache and transform the image on-the-fly
-                        import urllib.parse
-                        encoded_url = urllib.parse.quote(src_url, safe='')
-                        base_url = f"https://api-storage.arkturian.com/storage/proxy"
-                        thumb_url = f"{base_url}?url={encoded_url}&width=400&format=webp&quality=80"
-                        preview_url = f"{base_url}?url={encoded_url}&width=800&format=webp&quality=85"
-                        print_url = f"{base_url}?url={encoded_url}&width=2000&format=jpg&quality=95"
-                    else:
-                        # No image available
-                        thumb_url = None
-                        preview_url = None
-                        print_url = None
-                    
-                    media_asset = MediaAsset(
-                        link_id=m.id,
-                        role=m.role,
-                        type="image",  # Assume image for now
-                        alt=m.alt or f"{m.role.capitalize()} image",
-                        width=800,  # Default for picsum.photos
-                        height=800,
-                        aspectRatio=1.0,
-                        variants=ImageVariants(
-                            thumb=thumb_url,
-                            preview=preview_url,
-                            print=print_url,
-                        ),
-                        video=None,
-                        original_filename=None,
-                        mime_type="image/jpeg",
-                        file_size_bytes=None,
-                    )
-
-                # Add to appropriate collection
-                if m.role == "hero":
-                    media_collection.hero = media_asset
-                elif m.role == "detail":
-                    media_collection.detail.append(media_asset)
-                elif m.role == "lifestyle":
-                    media_collection.lifestyle.append(media_asset)
-
-        # Build ProductResolved
-        product_resolved = ProductResolved(
-            id=p.id,
-            sku=p.sku,
-            name=p.name,
-            brand=p.brand,
-            category=p.category,
-            season=p.season,
-            status=p.status,
-            certifications=p.certifications,
-            materials=p.materials,
-            colors=p.colors,
-            sizes=p.sizes,
-            price=price_resolved,
-            media=media_collection,
-            layout=LayoutHints(),  # Use defaults
-            meta=p.meta,
-            ai_tags=p.ai_tags,
-            ai_analysis=p.ai_analysis,
+    products = snapshot.products
+    descending = order == "desc"
+    if sort in snapshot.sorts:
+        sort_index = snapshot.sorts[sort]
+        return sort_index.page(selected, offset, window, descending=descending, after=after), sort_index.key_of
+
+    if sort == "relevance" and scores is not None:
+        ranked = sorted(
+            ((-score, products[pos].id, pos) for pos, score in scores.items() if selected[pos]),
+            reverse=descending,
         )
-        results.append(product_resolved)
+        if after is not None:
+            ranked = [r for r in ranked if ((r[0], r[1]) < after if descending else (r[0], r[1]) > after)]
 
-    return results
+        def relevance_key(pos: int) -> tuple:
+            return (-scores[pos], products[pos].id)
 
+        return [pos for _, _, pos in ranked[offset : offset + window]], relevance_key
 
-@router.get("/products/source-info", response_model=ProductSourceResponse)
-async def get_product_source_info(
-    product_id: Optional[str] = Query(None, description="Internal product ID"),
-    product_url: Optional[str] = Query(None, description="Direct product URL on oneal.eu"),
-    _: None = Depends(api_key_auth),
-):
+    candidates = np.arange(len(products)) if selected is None else np.flatnonzero(selected)
+    if after is not None:
+        # Resume after the product's current position; fall back to the recorded one if it was removed
+        start = snapshot.by_id.get(after[1], after[0])
+        candidates = candidates[np.searchsorted(candidates, start, side="right"):]
+
+    def catalog_key(pos: int) -> tuple:
+        return (pos, products[pos].id)
+
+    return candidates[offset : offset + window].tolist(), catalog_key
+
+
+async def to_resolved(snapshot, positions: List[int]) -> List[bytes]:
+    """
+    ProductResolved JSON for the given snapshot positions.
+
+    The snapshot holds each product's projection with fallback media URLs;
+    only Storage API variant data, looked up through the variant cache, is
+    overlaid per request.
+    """
+    entries = [snapshot.resolved[pos] for pos in positions]
+    queries = resolved_queries(entries)
+    variants_map = await storage_client.get_variants_batch_cached(queries) if queries else {}
+    return [resolved_json(entry, variants_map) for entry in entries]
+
+
+def _resolved_list_body(results: List[bytes], count: int, limit: int, offset: int, next_cursor: Optional[str]) -> bytes:
+    """ResolvedProductsResponse JSON around already rendered products."""
+    return b"".join((
+        b'{"count":',
+        str(count).encode("ascii"),
+        b',"limit":',
+        str(limit).encode("ascii"),
+        b',"offset":',
+        str(offset).encode("ascii"),
+        b',"results":[',
+        b",".join(results),
+        b'],"next_cursor":',
+        dumps_bytes(next_cursor),
+        b"}",
+    ))
+
+
+def _source_target(product_id: Optional[str], product_url: Optional[str]) -> Tuple[str, Optional[str]]:
+    """Absolute oneal.eu page URL and product id for a source-info request."""
     if not product_id and not product_url:
         raise HTTPException(status_code=400, detail="Provide either product_id or product_url")
 
@@ -403,8 +161,7 @@ async def get_product_source_info(
     resolved_id = product_id
 
     if not resolved_url:
-        products = load_products()
-        product = next((p for p in products if p.id == product_id), None)
+        product = catalog.get().get_by_id(product_id)
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
         meta_url = (product.meta or {}).get("product_url") if product.meta else None
@@ -416,8 +173,43 @@ async def get_product_source_info(
     if resolved_url.startswith("/"):
         resolved_url = urljoin("https://www.oneal.eu", resolved_url)
 
+    return resolved_url, resolved_id
+
+
+async def _ndjson_body(snapshot, positions: List[int]):
+    """Pre-rendered product JSON, one product per line, in chunks of about NDJSON_CHUNK_SIZE bytes."""
+    chunk: List[bytes] = []
+    size = 0
+    for pos in positions:
+        line = snapshot.product_json[pos]
+        chunk.append(line)
+        size += len(line) + 1
+        if size >= NDJSON_CHUNK_SIZE:
+            yield b"\n".join(chunk) + b"\n"
+            chunk = []
+            size = 0
+    if chunk:
+        yield b"\n".join(chunk) + b"\n"
+
+
+def _ndjson_response(snapshot, positions: List[int], count: int, headers: dict) -> StreamingResponse:
+    return StreamingResponse(
+        _ndjson_body(snapshot, positions),
+        media_type="application/x-ndjson",
+        headers={**headers, "X-Total-Count": str(count)},
+    )
+
+
+@router.get("/products/source-info", response_model=ProductSourceResponse)
+async def get_product_source_info(
+    product_id: Optional[str] = Query(None, description="Internal product ID"),
+    product_url: Optional[str] = Query(None, description="Direct product URL on oneal.eu"),
+    _: None = Depends(api_key_auth),
+):
+    resolved_url, resolved_id = _source_target(product_id, product_url)
+
     try:
-        source_data = fetch_product_source(resolved_url, resolved_id)
+        source_data = await fetch_product_source_async(resolved_url, resolved_id)
     except HTTPException:
         raise
     except Exception as exc:  # pragma: no cover - network errors mapped to HTTP
@@ -426,19 +218,83 @@ async def get_product_source_info(
     return source_data
 
 
+def _batch_line(item: ProductSourceBatchItem) -> bytes:
+    return item.model_dump_json().encode("utf-8") + b"\n"
+
+
+@router.post(
+    "/products/source-info/batch",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "One ProductSourceBatchItem per line"}},
+)
+async def get_product_source_info_batch(
+    payload: ProductSourceBatchRequest,
+    _: None = Depends(api_key_auth),
+):
+    """
+    Source info for many products, streamed as NDJSON.
+
+    Each requested id or URL gets one ProductSourceBatchItem line, written
+    as soon as its page is fetched, so fast pages are not held back by
+    slow ones. Lines are in completion order; ids that cannot be resolved
+    come first.
+    """
+    requested = [(pid, None) for pid in payload.product_ids] + [(None, url) for url in payload.product_urls]
+    if not requested:
+        raise HTTPException(status_code=400, detail="Provide product_ids or product_urls")
+    if len(requested) > SOURCE_BATCH_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {SOURCE_BATCH_MAX} products per batch")
+
+    failed: List[bytes] = []
+    pending: List[Tuple[Optional[str], Optional[str]]] = []
+    targets: List[Tuple[str, Optional[str]]] = []
+    for pid, url in requested:
+        try:
+            targets.append(_source_target(pid, url))
+        except HTTPException as exc:
+            item = ProductSourceBatchItem(product_id=pid, product_url=url, status=exc.status_code, error=exc.detail)
+            failed.append(_batch_line(item))
+            continue
+        pending.append((pid, url))
+
+    async def lines():
+        for line in failed:
+            yield line
+        async for index, outcome in product_source_client.fetch_many(targets):
+            pid, url = pending[index]
+            if isinstance(outcome, Exception):
+                item = ProductSourceBatchItem(
+                    product_id=pid,
+                    product_url=url,
+                    status=502,
+                    error=f"Failed to fetch product source: {outcome}",
+                )
+            else:
+                item = ProductSourceBatchItem(product_id=pid, product_url=url, result=outcome)
+            yield _batch_line(item)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/products", response_model=ProductListResponse)
 async def list_products(
-    search: Optional[str] = Query(default=None),
+    request: Request,
+    search: Optional[str] = Query(default=None, description="Full-text query; every word must match, prefixes allowed"),
     category: Optional[str] = Query(default=None),
     season: Optional[int] = Query(default=None),
     cert: Optional[str] = Query(default=None),
+    category_id: Optional[str] = Query(default=None, description="Taxonomy category id (cat:path/path)"),
+    status: Optional[str] = Query(default=None, description="active | draft | archived"),
+    tier: Optional[str] = Query(default=None, description="entry | mid | premium"),
+    series_id: Optional[str] = Query(default=None),
     price_min: Optional[float] = Query(default=None),
     price_max: Optional[float] = Query(default=None),
-    sort: Optional[str] = Query(default=None, pattern="^(name|price|season)$"),
+    sort: Optional[str] = Query(default=None, pattern="^(name|price|season|relevance)$"),
     order: Optional[str] = Query(default="asc", pattern="^(asc|desc)$"),
     limit: int = Query(default=50, ge=1, le=100000),
     offset: int = Query(default=0, ge=0),
-    format: Optional[str] = Query(default=None),
+    cursor: Optional[str] = Query(default=None, description="next_cursor of the previous page; offset then counts from there"),
+    format: Optional[str] = Query(default=None, description="resolved | ndjson (one product per line, streamed)"),
     _: None = Depends(api_key_auth),
 ):
     # If in test mode and resolved format requested, return test data directly
@@ -454,61 +310,121 @@ async def list_products(
         )
         return JSONResponse(content=response.model_dump())
 
-    products = load_products()
-
-    # filtering
-    def matches(p: Product) -> bool:
-        if search:
-            s = search.lower()
-            hay: List[str] = [p.name or "", p.id or "", (p.sku or ""), " ".join(p.category or [])]
-            if not any(s in h.lower() for h in hay):
-                return False
-        if category and (not p.category or category not in p.category):
-            return False
-        if season is not None and p.season != season:
-            return False
-        if cert and (not p.certifications or cert not in p.certifications):
-            return False
-        if price_min is not None:
-            if not p.price or p.price.value is None or p.price.value < price_min:
-                return False
-        if price_max is not None:
-            if not p.price or p.price.value is None or p.price.value > price_max:
-                return False
-        return True
-
-    filtered = [p for p in products if matches(p)]
-
-    # sorting
-    if sort:
-        reverse = order == "desc"
-        if sort == "name":
-            filtered.sort(key=lambda p: (p.name or "").lower(), reverse=reverse)
-        elif sort == "season":
-            filtered.sort(key=lambda p: (p.season or -1), reverse=reverse)
-        elif sort == "price":
-            filtered.sort(key=lambda p: (p.price.value if p.price else float("inf")), reverse=reverse)
-
-    count = len(filtered)
-    page = filtered[offset : offset + limit]
+    snapshot = catalog.get()
+    products = snapshot.products
+
+    # Conditional GET: the body is a pure function of the catalog files and the query,
+    # except for format=resolved, whose media also depend on Storage API data (validated below)
+    if format != "resolved":
+        etag = make_etag(snapshot.digest, request)
+        cached = not_modified(request, etag, snapshot.last_modified)
+        if cached is not None:
+            return cached
+        headers = cache_headers(etag, snapshot.last_modified)
+
+    # filtering: intersect posting lists and the search index hits
+    selected, scores = snapshot.select(
+        filter_terms(category, category_id, season, cert, status, tier, series_id),
+        price_min=price_min,
+        price_max=price_max,
+        search=search,
+    )
+    count = mask_count(selected, len(products))
+    after = _decode_cursor(cursor, sort, order) if cursor else None
+
+    # One extra item is fetched to know whether a next page exists
+    positions, key_of = _ordered_positions(snapshot, selected, scores, sort, order, offset, limit + 1, after)
+
+    next_cursor = None
+    if len(positions) > limit:
+        positions = positions[:limit]
+        next_cursor = _encode_cursor(sort, order, key_of(positions[-1]))
+
+    if format == "ndjson":
+        if next_cursor:
+            headers = {**headers, "X-Next-Cursor": next_cursor}
+        return _ndjson_response(snapshot, positions, count, headers)
 
     if format == "resolved":
-        results_resolved = await to_resolved(page)
-        response = ResolvedProductsResponse(
-            count=count,
-            limit=limit,
-            offset=offset,
-            results=results_resolved
-        )
-        return JSONResponse(content=response.model_dump())
+        results_resolved = await to_resolved(snapshot, positions)
+        body = _resolved_list_body(results_resolved, count, limit, offset, next_cursor)
+        # Validated by content: fallback media served during a Storage API outage must not stay "fresh"
+        etag = body_etag(body)
+        cached = not_modified(request, etag)
+        if cached is not None:
+            return cached
+        return Response(content=body, media_type="application/json", headers=cache_headers(etag))
+
+    if selected is None and sort is None and offset == 0 and after is None and len(positions) == count:
+        # The whole catalog in catalog order: same bytes for every such request
+        return precompressed_response(request, snapshot.encoded, "products", snapshot.full_list_body, headers)
+
+    return Response(
+        content=snapshot.list_body(positions, count, next_cursor),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+@router.get(
+    "/products/export",
+    response_class=StreamingResponse,
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "One Product per line"}},
+)
+async def export_products(
+    request: Request,
+    search: Optional[str] = Query(default=None, description="Full-text query; every word must match, prefixes allowed"),
+    category: Optional[str] = Query(default=None),
+    season: Optional[int] = Query(default=None),
+    cert: Optional[str] = Query(default=None),
+    category_id: Optional[str] = Query(default=None, description="Taxonomy category id (cat:path/path)"),
+    status: Optional[str] = Query(default=None, description="active | draft | archived"),
+    tier: Optional[str] = Query(default=None, description="entry | mid | premium"),
+    series_id: Optional[str] = Query(default=None),
+    price_min: Optional[float] = Query(default=None),
+    price_max: Optional[float] = Query(default=None),
+    sort: Optional[str] = Query(default=None, pattern="^(name|price|season|relevance)$"),
+    order: Optional[str] = Query(default="asc", pattern="^(asc|desc)$"),
+    _: None = Depends(api_key_auth),
+):
+    """
+    Every product matching the /products filters as NDJSON, streamed.
+
+    Lines are written from the snapshot's pre-rendered product JSON, so the
+    response is never built in memory as a whole; the export is consistent
+    with the catalog version it started on even if a reload happens meanwhile.
+    """
+    snapshot = catalog.get()
+    etag = make_etag(snapshot.digest, request)
+    cached = not_modified(request, etag, snapshot.last_modified)
+    if cached is not None:
+        return cached
+    headers = cache_headers(etag, snapshot.last_modified)
+
+    selected, scores = snapshot.select(
+        filter_terms(category, category_id, season, cert, status, tier, series_id),
+        price_min=price_min,
+        price_max=price_max,
+        search=search,
+    )
+    count = mask_count(selected, len(snapshot.products))
+    positions, _key_of = _ordered_positions(snapshot, selected, scores, sort, order, 0, count)
+    return _ndjson_response(snapshot, positions, count, headers)
 
-    return {"count": count, "results": page}
+
+@router.get("/products/by-sku/{sku}", response_model=Product)
+async def get_product_by_sku(sku: str, _: None = Depends(api_key_auth)):
+    snapshot = catalog.get()
+    return _product_response(snapshot, snapshot.by_sku.get(sku.strip()))
+
+
+@router.get("/products/by-gtin/{gtin}", response_model=Product)
+async def get_product_by_gtin(gtin: str, _: None = Depends(api_key_auth)):
+    snapshot = catalog.get()
+    return _product_response(snapshot, snapshot.by_gtin.get(gtin.strip()))
 
 
 @router.get("/products/{product_id}", response_model=Product)
 async def get_product(product_id: str, _: None = Depends(api_key_auth)):
-    products = load_products()
-    product = next((p for p in products if p.id == product_id), None)
-    if not product:
-        raise HTTPException(status_code=404, detail="Product not found")
-    return product
+    snapshot = catalog.get()
+    return _product_response(snapshot, snapshot.by_id.get(product_id))
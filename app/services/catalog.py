@@ -0,0 +1,459 @@
+"""
+Catalog snapshot for O'Neal Product API
+Loads products.json once, normalizes it and shares the result across routers
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from ..core.compression import PrecompressedBodies
+from ..core.serialization import dumps_bytes
+from ..models.product import Product
+from .catalog_columns import CatalogColumns, positions_mask
+from .catalog_index import SortIndex, build_facets, build_sort_indexes
+from .resolved_projection import ResolvedEntry, build_resolved_projection
+from .search_index import SearchIndex
+
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+DATA_FILE = DATA_DIR / "products.json"
+CAT_FILE = DATA_DIR / "kategorien.json"
+MEDIA_FILE = DATA_DIR / "category-media.json"
+
+# Seconds between data file checks of the background watcher
+POLL_INTERVAL = float(os.getenv("CATALOG_POLL_INTERVAL", "2.0"))
+
+ROOT_LABEL_BY_SOURCE = {
+    "mtb": "Mountainbike",
+    "mx": "Motocross",
+}
+
+CATEGORY_LABEL_MAP = {
+    "mtb": "Mountainbike",
+    "mx": "Motocross",
+    "helmets": "Helme",
+    "clothing": "Kleidung",
+    "gloves": "Handschuhe",
+    "protectors": "Protektoren",
+    "shoes": "Schuhe",
+    "accessories": "Accessories",
+    "other": "Weitere",
+}
+
+ROOT_LABELS = set(ROOT_LABEL_BY_SOURCE.values())
+
+CATEGORY_PATH_OVERRIDES = {
+    ("Mountainbike", "Helme"): ["Mountainbike", "Helme"],
+    ("Mountainbike", "Kleidung"): ["Mountainbike", "Kleidung"],
+    ("Mountainbike", "Handschuhe"): ["Mountainbike", "Kleidung", "Handschuhe"],
+    ("Mountainbike", "Protektoren"): ["Mountainbike", "Protektoren"],
+    ("Mountainbike", "Schuhe"): ["Mountainbike", "Schuhe"],
+    ("Mountainbike", "Accessories"): ["Mountainbike", "Accessories"],
+    ("Mountainbike", "Weitere"): ["Mountainbike", "Protektoren", "Weitere"],
+    ("Motocross", "Helme"): ["Motocross", "Helme"],
+    ("Motocross", "Kleidung"): ["Motocross", "Kleidung"],
+    ("Motocross", "Handschuhe"): ["Motocross", "Kleidung", "Handschuhe"],
+    ("Motocross", "Protektoren"): ["Motocross", "Protektoren"],
+    ("Motocross", "Schuhe"): ["Motocross", "Stiefel"],
+    ("Motocross", "Accessories"): ["Motocross", "Accessories"],
+    ("Motocross", "Weitere"): ["Motocross", "Protektoren", "Weitere"],
+}
+
+
+def _stable_float(seed: str, min_val: float, max_val: float) -> float:
+    """Deterministic pseudo-random float in [min_val, max_val] from a string seed."""
+    h = hashlib.md5(seed.encode("utf-8")).hexdigest()
+    # Use 8 hex chars -> 32-bit int
+    n = int(h[:8], 16)
+    r = n / 0xFFFFFFFF
+    return min_val + (max_val - min_val) * r
+
+
+def _normalize_product_dict(p: dict) -> dict:
+    """Ensure price and weight exist for test data. Does not mutate input dict."""
+    product = dict(p)
+    cat_list = product.get("category") or []
+    cat0 = (cat_list[0] if isinstance(cat_list, list) and cat_list else "Other").lower()
+
+    # Category-based ranges (rough, for demo data)
+    price_ranges = {
+        "helmets": (79.0, 449.0),
+        "gloves": (9.0, 59.0),
+        "clothing": (19.0, 299.0),
+        "protectors": (19.0, 199.0),
+        "shoes": (49.0, 299.0),
+        "boots": (49.0, 299.0),
+        "accessories": (5.0, 99.0),
+        "other": (10.0, 199.0),
+    }
+    weight_ranges_g = {
+        "helmets": (900.0, 1800.0),
+        "gloves": (80.0, 300.0),
+        "clothing": (200.0, 1500.0),
+        "protectors": (200.0, 1500.0),
+        "shoes": (800.0, 2500.0),
+        "boots": (800.0, 2500.0),
+        "accessories": (20.0, 800.0),
+        "other": (100.0, 2000.0),
+    }
+
+    # pick range by prefix matching
+    def _pick_range(mapping: dict) -> tuple[float, float]:
+        for key, rng in mapping.items():
+            if key in cat0:
+                return rng
+        return mapping["other"]
+
+    # Price normalization
+    price = product.get("price") or {}
+    price_value = price.get("value")
+    price_currency = price.get("currency") or "EUR"
+    if price_value is None:
+        lo, hi = _pick_range(price_ranges)
+        # Deterministic: id + category
+        seed = f"{product.get('id','')}-{cat0}-price"
+        value = round(_stable_float(seed, lo, hi), 2)
+        price_value = value
+    # formatted string
+    symbol = "€" if price_currency.upper() == "EUR" else price_currency
+    formatted = f"{symbol}{price_value:.2f}"
+    product["price"] = {"currency": price_currency, "value": float(price_value), "formatted": formatted}
+
+    # Weight normalization (grams) in specifications
+    specs = dict(product.get("specifications") or {})
+    weight = specs.get("weight")
+    if weight is None:
+        lo, hi = _pick_range(weight_ranges_g)
+        seed = f"{product.get('id','')}-{cat0}-weight"
+        specs["weight"] = round(_stable_float(seed, lo, hi), 1)
+    product["specifications"] = specs
+
+    return product
+
+
+def _slug_from_url(url: str) -> str:
+    s = (url or "").strip("/")
+    parts = s.split("/")
+    return parts[-1] if parts else s
+
+
+def _read_json(path: Path, default: Any) -> Tuple[Any, bytes]:
+    """Parsed content and raw bytes of a JSON data file; `default` if it does not exist."""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return default, b""
+    return json.loads(data), data
+
+
+def _normalize_category_labels(labels: List[str], source: Optional[str]) -> List[str]:
+    normalized: List[str] = []
+    root_label: Optional[str] = None
+    source_key = (source or "").strip().lower()
+
+    for label in labels or []:
+        canonical = CATEGORY_LABEL_MAP.get(label.strip().lower(), label.strip())
+        if canonical in ROOT_LABELS:
+            root_label = canonical
+        normalized.append(canonical)
+
+    if root_label is None and source_key:
+        root_label = ROOT_LABEL_BY_SOURCE.get(source_key)
+
+    if not root_label:
+        return normalized
+
+    sub_labels = [label for label in normalized if label and label != root_label]
+
+    for sub_label in sub_labels:
+        override = CATEGORY_PATH_OVERRIDES.get((root_label, sub_label))
+        if override:
+            return override
+
+    if sub_labels:
+        return [root_label, *sub_labels]
+
+    return [root_label]
+
+
+def _resolve_category_ids_from_labels(labels: List[str], taxonomy: Dict[str, Any]) -> List[str]:
+    ids: List[str] = []
+    nodes = taxonomy.get("taxonomy", [])
+    path_slugs: List[str] = []
+    for label in labels:
+        match = next((n for n in nodes if (n.get("label") or "").strip().lower() == label.strip().lower()), None)
+        if not match:
+            break
+        slug = _slug_from_url(match.get("url") or match.get("label", "").lower().replace(" ", "-"))
+        if slug:
+            path_slugs.append(slug)
+            ids.append(f"cat:{'/'.join(path_slugs)}")
+        nodes = match.get("children", []) or []
+    return ids
+
+
+def build_products(raw: List[dict], taxonomy: Dict[str, Any]) -> List[Product]:
+    """Normalize raw products.json records and enrich them with taxonomy category ids."""
+    normalized = [_normalize_product_dict(p) for p in raw]
+    enriched: List[Product] = []
+    for p in normalized:
+        if isinstance(p.get("category"), list) and p.get("category") and not p.get("category_ids"):
+            meta = p.get("meta") or {}
+            labels = _normalize_category_labels(p["category"], meta.get("source"))
+            ids = _resolve_category_ids_from_labels(labels, taxonomy) if labels else []
+            if ids:
+                reordered_labels = labels
+                reordered_ids = ids
+                if len(labels) > 1 and len(labels) == len(ids):
+                    root_label, root_id = labels[0], ids[0]
+                    branch_labels = labels[1:]
+                    branch_ids = ids[1:]
+                    primary_label = branch_labels[0]
+                    primary_id = branch_ids[0]
+                    tail_labels = branch_labels[1:]
+                    tail_ids = branch_ids[1:]
+
+                    reordered_labels = [primary_label]
+                    reordered_ids = [primary_id]
+                    if tail_labels:
+                        reordered_labels.extend(tail_labels)
+                        reordered_ids.extend(tail_ids)
+                    reordered_labels.append(root_label)
+                    reordered_ids.append(root_id)
+
+                p["category"] = reordered_labels
+                p["category_ids"] = reordered_ids
+        enriched.append(Product(**p))
+    return enriched
+
+
+def _file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None if it does not exist."""
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _build_lookup_indexes(products: List[Product]) -> Tuple[Dict[str, int], Dict[str, int], Dict[str, int]]:
+    """Map product id, SKU and variant GTIN to list positions. First occurrence wins."""
+    by_id: Dict[str, int] = {}
+    by_sku: Dict[str, int] = {}
+    by_gtin: Dict[str, int] = {}
+    for pos, p in enumerate(products):
+        by_id.setdefault(p.id, pos)
+        if p.sku:
+            by_sku.setdefault(p.sku.strip(), pos)
+        for v in p.variants or []:
+            if v.sku:
+                by_sku.setdefault(v.sku.strip(), pos)
+            if v.gtin13:
+                by_gtin.setdefault(v.gtin13.strip(), pos)
+    return by_id, by_sku, by_gtin
+
+
+@dataclass
+class CatalogSnapshot:
+    """Immutable, fully built view of the catalog shared by all requests."""
+    version: int
+    loaded_at: datetime
+    signature: Tuple[Optional[Tuple[int, int]], ...]
+    # Content hash of all data files; identical across workers serving the same files
+    digest: str = ""
+    # Newest data file modification time
+    last_modified: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    products: List[Product] = field(default_factory=list)
+    taxonomy: Dict[str, Any] = field(default_factory=dict)
+    category_media: Dict[str, Any] = field(default_factory=dict)
+    by_id: Dict[str, int] = field(default_factory=dict)
+    by_sku: Dict[str, int] = field(default_factory=dict)
+    by_gtin: Dict[str, int] = field(default_factory=dict)
+    columns: CatalogColumns = field(default_factory=lambda: CatalogColumns([]))
+    search: SearchIndex = field(default_factory=lambda: SearchIndex([]))
+    sorts: Dict[str, SortIndex] = field(default_factory=dict)
+    facets: Dict[str, Any] = field(default_factory=dict)
+    # JSON bytes of each product, aligned with `products`
+    product_json: List[bytes] = field(default_factory=list)
+    # format=resolved projection of each product with fallback media, aligned with `products`
+    resolved: List[ResolvedEntry] = field(default_factory=list)
+    # Rendered and compressed bodies of the cacheable responses (full list, facets, categories, media)
+    encoded: PrecompressedBodies = field(default_factory=PrecompressedBodies)
+
+    def get_by_id(self, product_id: str) -> Optional[Product]:
+        pos = self.by_id.get(product_id)
+        return self.products[pos] if pos is not None else None
+
+    def list_body(self, positions: List[int], count: int, next_cursor: Optional[str] = None) -> bytes:
+        """ProductListResponse JSON assembled from the pre-rendered product bytes."""
+        return b"".join((
+            b'{"count":',
+            str(count).encode("ascii"),
+            b',"results":[',
+            b",".join([self.product_json[pos] for pos in positions]),
+            b'],"next_cursor":',
+            dumps_bytes(next_cursor),
+            b"}",
+        ))
+
+    def full_list_body(self) -> bytes:
+        """The whole catalog in one unsorted, unfiltered page."""
+        return self.list_body(list(range(len(self.products))), len(self.products))
+
+    def select(
+        self,
+        terms: Mapping[str, Any],
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None,
+        search: Optional[str] = None,
+    ) -> Tuple[Optional[np.ndarray], Optional[Dict[int, float]]]:
+        """
+        Boolean mask of products matching the filter terms, price range and search query.
+
+        Returns (mask, scores): mask is None when nothing constrains the
+        result; scores holds search relevance per position when a query was
+        given.
+        """
+        mask = self.columns.select(terms, price_min=price_min, price_max=price_max)
+        scores = self.search.search(search) if search else None
+        if scores is not None:
+            hits = positions_mask(scores, len(self.products))
+            mask = hits if mask is None else mask & hits
+        return mask, scores
+
+
+class Catalog:
+    """
+    Process-wide holder of the current catalog snapshot.
+
+    A snapshot covers products.json, kategorien.json and category-media.json.
+    Snapshots are built off the request path (at startup and by the file
+    watcher) and published with a single reference assignment, so readers
+    always see either the previous or the next complete catalog.
+    """
+
+    def __init__(self, data_file: Path = DATA_FILE, cat_file: Path = CAT_FILE, media_file: Path = MEDIA_FILE):
+        self.data_file = data_file
+        self.cat_file = cat_file
+        self.media_file = media_file
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = threading.Lock()
+        self._version = 0
+        self._rejected: Optional[Tuple[Optional[Tuple[int, int]], ...]] = None
+
+    def _signature(self) -> Tuple[Optional[Tuple[int, int]], ...]:
+        return (
+            _file_signature(self.data_file),
+            _file_signature(self.cat_file),
+            _file_signature(self.media_file),
+        )
+
+    def _build(self, signature: Tuple[Optional[Tuple[int, int]], ...]) -> CatalogSnapshot:
+        raw, raw_bytes = _read_json(self.data_file, [])
+        taxonomy, taxonomy_bytes = _read_json(self.cat_file, {"taxonomy": []})
+        category_media, media_bytes = _read_json(self.media_file, {"version": "0", "media": []})
+        digest = hashlib.sha1()
+        for data in (raw_bytes, taxonomy_bytes, media_bytes):
+            digest.update(hashlib.sha1(data).digest())
+        mtimes = [sig[0] for sig in signature if sig is not None]
+        last_modified = (
+            datetime.fromtimestamp(max(mtimes) / 1e9, tz=timezone.utc) if mtimes else datetime.now(timezone.utc)
+        )
+
+        products = build_products(raw, taxonomy)
+        by_id, by_sku, by_gtin = _build_lookup_indexes(products)
+        columns = CatalogColumns(products)
+        snapshot = CatalogSnapshot(
+            version=0,
+            loaded_at=datetime.now(timezone.utc),
+            signature=signature,
+            digest=digest.hexdigest(),
+            last_modified=last_modified,
+            products=products,
+            taxonomy=taxonomy,
+            category_media=category_media,
+            by_id=by_id,
+            by_sku=by_sku,
+            by_gtin=by_gtin,
+            columns=columns,
+            search=SearchIndex(products),
+            sorts=build_sort_indexes(products),
+            facets=build_facets(columns),
+            product_json=[dumps_bytes(p.model_dump(mode="json")) for p in products],
+            resolved=build_resolved_projection(products),
+        )
+        # The full listing is the largest body we serve; compress it here, off the request path
+        snapshot.encoded.warm("products", snapshot.full_list_body)
+        return snapshot
+
+    def _publish(self, snapshot: CatalogSnapshot) -> CatalogSnapshot:
+        self._version += 1
+        snapshot.version = self._version
+        self._snapshot = snapshot
+        return snapshot
+
+    def load(self) -> CatalogSnapshot:
+        """Build a fresh snapshot from disk and make it current."""
+        with self._lock:
+            return self._publish(self._build(self._signature()))
+
+    def refresh(self) -> bool:
+        """
+        Rebuild and swap in a new snapshot if the data files changed.
+
+        A file that is still being written either fails to parse or changes
+        its (mtime, size) signature while we build; in both cases the current
+        snapshot is kept and the next poll tries again.
+        """
+        with self._lock:
+            current = self._snapshot
+            signature = self._signature()
+            if current is not None and current.signature == signature:
+                return False
+            if signature == self._rejected:
+                return False
+            try:
+                snapshot = self._build(signature)
+            except (json.JSONDecodeError, UnicodeDecodeError, ValueError) as e:
+                print(f"Catalog reload skipped, data file not readable yet: {e}")
+                self._rejected = signature
+                return False
+            if self._signature() != signature:
+                return False
+            self._publish(snapshot)
+        print(f"Catalog reloaded: version {snapshot.version}, {len(snapshot.products)} products")
+        return True
+
+    async def watch(self, interval: float = POLL_INTERVAL) -> None:
+        """Poll the data files and swap in rebuilt snapshots in a worker thread."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                print(f"Catalog reload failed: {e}")
+
+    def get(self) -> CatalogSnapshot:
+        """Return the current snapshot; only the very first call may build it inline."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None:
+                self._publish(self._build(self._signature()))
+            return self._snapshot
+
+
+# Singleton instance
+catalog = Catalog()
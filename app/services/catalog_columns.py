@@ -0,0 +1,236 @@
+"""
+Columnar view of the catalog snapshot
+NumPy arrays aligned with catalog positions for vectorized filtering and aggregation
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.product import Product
+
+
+# Product attribute -> whether it holds a list of values
+FILTER_FIELDS: Dict[str, bool] = {
+    "category": True,
+    "category_ids": True,
+    "season": False,
+    "certifications": True,
+    "status": False,
+    "tier": False,
+    "series_id": False,
+}
+
+
+def positions_mask(positions: Iterable[int], size: int) -> np.ndarray:
+    """Boolean mask over the catalog with the given positions set."""
+    mask = np.zeros(size, dtype=bool)
+    mask[np.fromiter(positions, dtype=np.intp)] = True
+    return mask
+
+
+class CategoricalColumn:
+    """
+    Single-valued attribute stored as interned integer codes (-1 = missing).
+
+    `values[code]` is the original value; `lookup` maps a value to its code.
+    """
+
+    def __init__(self, raw: Sequence[Any]):
+        self.values: List[Any] = []
+        self.lookup: Dict[Any, int] = {}
+        codes = np.full(len(raw), -1, dtype=np.int32)
+        for pos, value in enumerate(raw):
+            if value is None:
+                continue
+            code = self.lookup.get(value)
+            if code is None:
+                code = self.lookup[value] = len(self.values)
+                self.values.append(value)
+            codes[pos] = code
+        self.codes = codes
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes
+
+    def mask(self, value: Any, size: int) -> np.ndarray:
+        code = self.lookup.get(value)
+        if code is None:
+            return np.zeros(size, dtype=bool)
+        return self.codes == code
+
+    def counts(self, mask: Optional[np.ndarray] = None) -> Dict[Any, int]:
+        codes = self.codes if mask is None else self.codes[mask]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.values))
+        return dict(zip(self.values, counts.tolist()))
+
+
+class MultiValueColumn:
+    """
+    List-valued attribute (categories, certifications) stored as (row, code)
+    pairs of interned integer codes, one pair per distinct value per product.
+    """
+
+    def __init__(self, raw: Sequence[Optional[Sequence[Any]]]):
+        self.values: List[Any] = []
+        self.lookup: Dict[Any, int] = {}
+        rows: List[int] = []
+        codes: List[int] = []
+        for pos, items in enumerate(raw):
+            for value in dict.fromkeys(items or ()):
+                code = self.lookup.get(value)
+                if code is None:
+                    code = self.lookup[value] = len(self.values)
+                    self.values.append(value)
+                rows.append(pos)
+                codes.append(code)
+        self.rows = np.asarray(rows, dtype=np.int32)
+        self.codes = np.asarray(codes, dtype=np.int32)
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows.nbytes + self.codes.nbytes
+
+    def mask(self, value: Any, size: int) -> np.ndarray:
+        mask = np.zeros(size, dtype=bool)
+        code = self.lookup.get(value)
+        if code is not None:
+            mask[self.rows[self.codes == code]] = True
+        return mask
+
+    def counts(self, mask: Optional[np.ndarray] = None) -> Dict[Any, int]:
+        codes = self.codes if mask is None else self.codes[mask[self.rows]]
+        counts = np.bincount(codes, minlength=len(self.values))
+        return dict(zip(self.values, counts.tolist()))
+
+
+class CatalogColumns:
+    """
+    Typed arrays aligned with snapshot positions, kept alongside the Product models.
+
+    Numeric attributes are float64 with NaN for missing values; categorical
+    attributes are interned int32 codes. Filters evaluate to boolean masks,
+    where None stands for "whole catalog". Prices are additionally kept
+    sorted, so price ranges, histograms and percentiles are binary searches.
+    """
+
+    def __init__(self, products: List[Product]):
+        self.size = len(products)
+        self.price = np.array(
+            [p.price.value if p.price and p.price.value is not None else np.nan for p in products],
+            dtype=np.float64,
+        )
+        self.weight = np.array(
+            [p.specifications.weight if p.specifications and p.specifications.weight is not None else np.nan
+             for p in products],
+            dtype=np.float64,
+        )
+        self.fields: Dict[str, Any] = {
+            name: (MultiValueColumn if multi else CategoricalColumn)([getattr(p, name) for p in products])
+            for name, multi in FILTER_FIELDS.items()
+        }
+
+        # argsort puts NaN last; rank maps a position to its slot in the sorted order
+        order = np.argsort(self.price, kind="stable")
+        self._priced = int(np.count_nonzero(~np.isnan(self.price)))
+        self._sorted_price = self.price[order][: self._priced]
+        self._price_rank = np.empty(self.size, dtype=np.intp)
+        self._price_rank[order] = np.arange(self.size, dtype=np.intp)
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.price, self.weight, self._sorted_price, self._price_rank)
+        return sum(a.nbytes for a in arrays) + sum(col.nbytes for col in self.fields.values())
+
+    def select(
+        self,
+        terms: Mapping[str, Any],
+        price_min: Optional[float] = None,
+        price_max: Optional[float] = None,
+    ) -> Optional[np.ndarray]:
+        """
+        Mask of products matching all equality terms and the price range.
+
+        `terms` maps FILTER_FIELDS names to a required value; None values are
+        ignored. Returns None when nothing constrains the result.
+        """
+        mask: Optional[np.ndarray] = None
+        for name, value in terms.items():
+            if value is None:
+                continue
+            term_mask = self.fields[name].mask(value, self.size)
+            mask = term_mask if mask is None else mask & term_mask
+        if price_min is not None or price_max is not None:
+            # NaN compares False, so unpriced products never match a price filter
+            price_mask = np.ones(self.size, dtype=bool) if price_max is None else self.price <= price_max
+            if price_min is not None:
+                price_mask &= self.price >= price_min
+            mask = price_mask if mask is None else mask & price_mask
+        return mask
+
+    def counts(self, field: str, mask: Optional[np.ndarray] = None) -> Dict[Any, int]:
+        """Number of products per value of `field`, optionally restricted to `mask`."""
+        return self.fields[field].counts(mask)
+
+    def _sorted_prices(self, mask: Optional[np.ndarray]) -> np.ndarray:
+        """Ascending prices of the masked products (all products when None)."""
+        if mask is None:
+            return self._sorted_price
+        in_order = np.zeros(self.size, dtype=bool)
+        in_order[self._price_rank[mask]] = True
+        return self._sorted_price[in_order[: self._priced]]
+
+    def price_bounds(self, mask: Optional[np.ndarray] = None) -> Tuple[Optional[float], Optional[float]]:
+        """(min, max) price over the whole catalog or over `mask`."""
+        values = self._sorted_prices(mask)
+        if not values.size:
+            return None, None
+        return float(values[0]), float(values[-1])
+
+    def price_histogram(
+        self,
+        mask: Optional[np.ndarray] = None,
+        buckets: int = 10,
+        edges: Optional[Sequence[float]] = None,
+    ) -> Dict[str, List[float]]:
+        """
+        Price histogram over the masked products.
+
+        Uses explicit `edges` when given, otherwise `buckets` equal-width
+        buckets spanning the selection's price range. Buckets are half-open
+        except the last, which is closed on the right (as in numpy.histogram).
+        """
+        values = self._sorted_prices(mask)
+        if edges is not None:
+            bin_edges = np.asarray(edges, dtype=np.float64)
+        elif values.size:
+            bin_edges = np.linspace(values[0], values[-1], buckets + 1)
+        else:
+            return {"edges": [], "counts": []}
+        bounds = np.searchsorted(values, bin_edges, side="left")
+        bounds[-1] = np.searchsorted(values, bin_edges[-1], side="right")
+        counts = np.diff(bounds)
+        return {"edges": [round(float(e), 2) for e in bin_edges], "counts": counts.tolist()}
+
+    def price_percentiles(
+        self,
+        mask: Optional[np.ndarray],
+        percentiles: Sequence[float],
+    ) -> Dict[str, Optional[float]]:
+        """
+        Price percentiles (0-100) over the masked products, keyed by the requested percentile.
+
+        Linear interpolation between the closest ranks, matching numpy.percentile's default.
+        """
+        values = self._sorted_prices(mask)
+        keys = [f"{q:g}" for q in percentiles]
+        if not values.size:
+            return {k: None for k in keys}
+        ranks = np.asarray(percentiles, dtype=np.float64) / 100.0 * (values.size - 1)
+        lower = np.floor(ranks).astype(np.intp)
+        upper = np.minimum(lower + 1, values.size - 1)
+        results = values[lower] + (values[upper] - values[lower]) * (ranks - lower)
+        return {k: round(float(v), 2) for k, v in zip(keys, results)}
@@ -0,0 +1,137 @@
+"""
+Facet and sort indexes for the catalog snapshot
+Facet payloads computed from the columnar store, and presorted permutations per sort key
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from typing import Any, Callable, Dict, List, Mapping, Optional
+
+import numpy as np
+
+from ..models.product import Product
+from .catalog_columns import CatalogColumns
+
+
+# Facet name in /v1/facets -> FILTER_FIELDS attribute
+FACET_FIELDS: Dict[str, str] = {
+    "category": "category",
+    "season": "season",
+    "certification": "certifications",
+}
+
+
+def filter_terms(
+    category: Optional[str] = None,
+    category_id: Optional[str] = None,
+    season: Optional[int] = None,
+    cert: Optional[str] = None,
+    status: Optional[str] = None,
+    tier: Optional[str] = None,
+    series_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Map /v1/products filter parameters to column filter terms; empty strings mean "no filter"."""
+    return {
+        "category": category or None,
+        "category_ids": category_id or None,
+        "season": season,
+        "certifications": cert or None,
+        "status": status or None,
+        "tier": tier or None,
+        "series_id": series_id or None,
+    }
+
+
+def mask_count(mask: Optional[np.ndarray], size: int) -> int:
+    return size if mask is None else int(np.count_nonzero(mask))
+
+
+def build_facets(
+    columns: CatalogColumns,
+    selections: Optional[Mapping[str, Optional[np.ndarray]]] = None,
+    selected: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """
+    /v1/facets payload: every facet value, per-value counts, price range and total.
+
+    `selections` holds, per facet name (and "price"), the mask of products
+    matching all active filters except that facet's own, so counts show what a
+    click on the value would return. `selected` masks the products matching
+    every filter. Missing entries mean "whole catalog".
+    """
+    selections = selections or {}
+    values: Dict[str, Any] = {}
+    counts: Dict[str, Any] = {}
+    for name, field in FACET_FIELDS.items():
+        field_counts = columns.counts(field, selections.get(name))
+        values[name] = sorted(field_counts)
+        counts[name] = {v: field_counts[v] for v in values[name]}
+    min_price, max_price = columns.price_bounds(selections.get("price"))
+    return {
+        **values,
+        "priceRange": {"min": min_price or 0, "max": max_price or 0},
+        "counts": counts,
+        "total": mask_count(selected, columns.size),
+    }
+
+
+# Sort key per `sort` query value; missing values sort as before (season first, price last)
+SORT_KEYS: Dict[str, Callable[[Product], Any]] = {
+    "name": lambda p: (p.name or "").lower(),
+    "season": lambda p: p.season or -1,
+    "price": lambda p: p.price.value if p.price and p.price.value is not None else float("inf"),
+}
+
+
+class SortIndex:
+    """
+    Presorted permutation of catalog positions for one sort key.
+
+    Ties are broken on product id so pages are deterministic. Descending
+    order is the ascending permutation walked backwards. Restricting the
+    permutation to a filter mask is a single vectorized gather, so a sorted
+    page never sorts the selection.
+    """
+
+    def __init__(self, products: List[Product], key: Callable[[Product], Any]):
+        keyed = sorted((key(p), p.id, pos) for pos, p in enumerate(products))
+        self.keys: List[tuple] = [(k, pid) for k, pid, _ in keyed]
+        self.order = np.array([pos for _, _, pos in keyed], dtype=np.intp)
+        self.rank = np.empty(len(keyed), dtype=np.intp)
+        self.rank[self.order] = np.arange(len(keyed), dtype=np.intp)
+
+    def key_of(self, pos: int) -> tuple:
+        """(sort value, id) of a catalog position, as used for keyset cursors."""
+        return self.keys[self.rank[pos]]
+
+    def page(
+        self,
+        mask: Optional[np.ndarray],
+        offset: int,
+        limit: int,
+        descending: bool = False,
+        after: Optional[tuple] = None,
+    ) -> List[int]:
+        """
+        Positions of the `limit` items after `offset` in sort order, restricted to `mask`.
+
+        `after` is a (sort value, id) key from a previous page; only items
+        strictly past it (in the requested direction) are considered.
+        """
+        lo, hi = 0, len(self.keys)
+        if after is not None:
+            if descending:
+                hi = bisect_left(self.keys, after)
+            else:
+                lo = bisect_right(self.keys, after)
+        window = self.order[lo:hi]
+        if mask is not None:
+            window = window[mask[window]]
+        if descending:
+            window = window[::-1]
+        return window[offset : offset + limit].tolist()
+
+
+def build_sort_indexes(products: List[Product]) -> Dict[str, SortIndex]:
+    return {name: SortIndex(products, key) for name, key in SORT_KEYS.items()}
@@ -0,0 +1,73 @@
+"""
+Circuit breaker for upstream calls
+Stops calling a failing dependency for a while and probes it before resuming
+"""
+
+import time
+from typing import Any, Dict, Optional
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures.
+
+    While open, calls are rejected immediately. After `reset_timeout`
+    seconds the breaker goes half-open and lets a single probe call
+    through: success closes it, failure opens it for another period, and
+    a cancelled probe (record_cancel) lets the next call probe instead.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        """Whether a call may go upstream now; a True in half-open state reserves the probe."""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic() if now is None else now
+        if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_cancel(self) -> None:
+        """An allowed call was cancelled before it had a result; release the probe if it held it."""
+        if self.state == HALF_OPEN:
+            self._probing = False
+
+    def record_failure(self, now: Optional[float] = None) -> None:
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.trips += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic() if now is None else now
+            self._probing = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
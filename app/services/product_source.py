@@ -1,12 +1,15 @@
 from __future__ import annotations
 
-import json
-from dataclasses import dataclass
-from typing import List, Optional, Tuple
+import asyncio
+import os
+import time
+import zlib
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import replace
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from urllib.parse import urljoin
 
 import httpx
-from bs4 import BeautifulSoup
 
 from ..models.product_source import (
     ProductOffer,
@@ -14,9 +17,21 @@ from ..models.product_source import (
     ProductSourceTaxonomy,
     TechnicalTable,
 )
+from .source_cache import CACHE_TTL, SourceCache, SourcePage
+from .source_extract import extract_page, extract_schema_page
 
 
-DEFAULT_TIMEOUT = 30.0
+DEFAULT_TIMEOUT = float(os.getenv("PRODUCT_SOURCE_TIMEOUT", "30.0"))
+
+# HTML parsing pool for the async path: "thread" or "process" (sidesteps the GIL for BeautifulSoup)
+PARSE_EXECUTOR = os.getenv("PRODUCT_SOURCE_PARSE_EXECUTOR", "thread").lower()
+PARSE_WORKERS = int(os.getenv("PRODUCT_SOURCE_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+MAX_CONNECTIONS = int(os.getenv("PRODUCT_SOURCE_MAX_CONNECTIONS", "20"))
+# Pages fetched at the same time for one batch request
+BATCH_CONCURRENCY = int(os.getenv("PRODUCT_SOURCE_BATCH_CONCURRENCY", "8"))
+
+# Bump when parse_product_source output changes; cached pages are then re-parsed from their stored HTML
+PARSER_VERSION = 2
 
 
 SPORT_KEYWORDS = {
@@ -60,42 +75,11 @@ FAMILY_PATH_MAP = {
 }
 
 
-@dataclass
-class _ExtractionResult:
-    html: str
-    soup: BeautifulSoup
-    schema: Optional[dict]
-
-
-def _fetch_page(url: str) -> _ExtractionResult:
+def _fetch_html(url: str) -> str:
     with httpx.Client(timeout=DEFAULT_TIMEOUT, follow_redirects=True) as client:
         response = client.get(url)
         response.raise_for_status()
-        html = response.text
-
-    soup = BeautifulSoup(html, "html.parser")
-
-    schema_product: Optional[dict] = None
-    for script in soup.find_all("script", type="application/ld+json"):
-        if not script.string:
-            continue
-        try:
-            data = json.loads(script.string)
-        except json.JSONDecodeError:
-            continue
-        # schema could be a dict or a list
-        if isinstance(data, dict) and data.get("@type") == "Product":
-            schema_product = data
-            break
-        if isinstance(data, list):
-            for item in data:
-                if isinstance(item, dict) and item.get("@type") == "Product":
-                    schema_product = item
-                    break
-        if schema_product:
-            break
-
-    return _ExtractionResult(html=html, soup=soup, schema=schema_product)
+        return response.text
 
 
 def _extract_offers(schema: Optional[dict], base_url: str) -> Tuple[List[ProductOffer], Optional[float], Optional[str], Optional[str]]:
@@ -141,53 +125,9 @@ def _extract_offers(schema: Optional[dict], base_url: str) -> Tuple[List[Product
     return offers, price, currency, availability
 
 
-def _extract_description_text(soup: BeautifulSoup) -> Tuple[Optional[str], List[str]]:
-    container = soup.select_one(
-        "[data-product-description], .product__description, .product-single__description, #product-description"
-    )
-    description = None
-    features: List[str] = []
-
-    if not container:
-        return description, features
-
-    description = container.get_text(" ", strip=True) or None
-
-    seen = set()
-    for li in container.find_all("li"):
-        text = li.get_text(" ", strip=True)
-        if text and text not in seen:
-            features.append(text)
-            seen.add(text)
-
-    for p in container.find_all("p"):
-        text = p.get_text(" ", strip=True)
-        if text and ":" in text and text not in seen:
-            features.append(text)
-            seen.add(text)
-
-    return description, features
-
-
-def _extract_technical_tables(soup: BeautifulSoup) -> List[TechnicalTable]:
+def _technical_tables(matrices: List[List[List[str]]]) -> List[TechnicalTable]:
     tables: List[TechnicalTable] = []
-    seen = set()
-
-    for table in soup.select("table"):
-        matrix: List[List[str]] = []
-        for row in table.find_all("tr"):
-            cells = [cell.get_text(" ", strip=True) for cell in row.find_all(["th", "td"])]
-            if any(cell for cell in cells):
-                matrix.append(cells)
-
-        if not matrix:
-            continue
-
-        key = tuple(tuple(row) for row in matrix)
-        if key in seen:
-            continue
-        seen.add(key)
-
+    for matrix in matrices:
         headers: List[str] = []
         body = matrix
         # If first row looks like a header (text in all cells), treat it as such
@@ -200,20 +140,6 @@ def _extract_technical_tables(soup: BeautifulSoup) -> List[TechnicalTable]:
     return tables
 
 
-def _extract_collections(soup: BeautifulSoup) -> List[str]:
-    collections: List[str] = []
-    seen = set()
-    for link in soup.select('a[href*="/collections/"]'):
-        text = link.get_text(strip=True)
-        if not text:
-            continue
-        if text in seen:
-            continue
-        seen.add(text)
-        collections.append(text)
-    return collections
-
-
 def _derive_taxonomy(collections: List[str], schema_category: Optional[str]) -> ProductSourceTaxonomy:
     sport = None
     product_family = None
@@ -255,20 +181,29 @@ def _derive_taxonomy(collections: List[str], schema_category: Optional[str]) ->
     return ProductSourceTaxonomy(sport=sport, product_family=product_family, path=path)
 
 
-def fetch_product_source(product_url: str, product_id: Optional[str] = None) -> ProductSourceResponse:
-    extraction = _fetch_page(product_url)
-    schema = extraction.schema or {}
+def parse_product_source(
+    html: str,
+    product_url: str,
+    product_id: Optional[str] = None,
+    schema_only: bool = False,
+    backend: Optional[str] = None,
+) -> ProductSourceResponse:
+    """
+    Build the source response from a downloaded product page (CPU only, safe to run in a pool).
+
+    With `schema_only` only the JSON-LD data (title, brand, offers, category)
+    is read, without building a DOM; description, features, technical data
+    and collections stay empty.
+    """
+    page = extract_schema_page(html) if schema_only else extract_page(html, backend)
+    schema = page.schema or {}
 
-    title = None
-    if schema.get("name"):
-        title = schema.get("name")
-    elif extraction.soup.title:
-        title = extraction.soup.title.get_text(strip=True)
+    title = schema.get("name") or page.title
 
     offers, price, currency, availability = _extract_offers(schema, product_url)
-    description, features = _extract_description_text(extraction.soup)
-    technical_data = _extract_technical_tables(extraction.soup)
-    collections = _extract_collections(extraction.soup)
+    description, features = page.description, page.features
+    technical_data = _technical_tables(page.tables)
+    collections = page.collections
     taxonomy = _derive_taxonomy(collections, schema.get("category"))
 
     brand = schema.get("brand")
@@ -293,3 +228,180 @@ def fetch_product_source(product_url: str, product_id: Optional[str] = None) ->
     )
 
     return source_response
+
+
+def fetch_product_source(product_url: str, product_id: Optional[str] = None) -> ProductSourceResponse:
+    """Blocking fetch + parse, for scripts; the API uses fetch_product_source_async."""
+    return parse_product_source(_fetch_html(product_url), product_url, product_id)
+
+
+def _for_product(response: ProductSourceResponse, product_id: Optional[str]) -> ProductSourceResponse:
+    """Cached responses are stored without a caller product id; apply the requested one."""
+    if not product_id or response.product_id == product_id:
+        return response
+    return response.model_copy(update={"product_id": product_id})
+
+
+class ProductSourceClient:
+    """
+    Async product page fetcher for the API.
+
+    Pages are downloaded with one shared, pooled httpx.AsyncClient and
+    parsed in a worker pool, so neither a slow oneal.eu response nor a
+    large page's parse blocks the event loop.
+
+    Downloaded pages and their parsed responses are kept in a SourceCache.
+    Within `ttl` a page is served from the cache; after that it is
+    revalidated with If-None-Match / If-Modified-Since, and a 304 reuses
+    the stored response without downloading or parsing the page.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        cache: Optional[SourceCache] = None,
+        ttl: float = CACHE_TTL,
+        parse_executor: str = PARSE_EXECUTOR,
+        parse_workers: int = PARSE_WORKERS,
+    ):
+        self.timeout = timeout
+        self.cache = cache or SourceCache()
+        self.ttl = ttl
+        self.parse_executor = parse_executor
+        self.parse_workers = parse_workers
+        self._client: Optional[httpx.AsyncClient] = None
+        self._executor: Optional[Executor] = None
+        self._hits = 0
+        self._revalidated = 0
+        self._downloads = 0
+
+    async def start(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=MAX_CONNECTIONS),
+            )
+        if self._executor is None:
+            if self.parse_executor == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.parse_workers, thread_name_prefix="source-parse")
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        self.cache.close()
+
+    def stats(self) -> dict:
+        return {"cache_hits": self._hits, "revalidated": self._revalidated, "downloads": self._downloads}
+
+    async def fetch_html(self, url: str) -> str:
+        if self._client is None:
+            await self.start()
+        response = await self._client.get(url)
+        response.raise_for_status()
+        return response.text
+
+    async def parse(self, html: str, product_url: str, product_id: Optional[str] = None) -> ProductSourceResponse:
+        if self._executor is None:
+            await self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, parse_product_source, html, product_url, product_id)
+
+    async def _cached_page(self, url: str) -> Optional[SourcePage]:
+        page = self.cache.get_memory(url) or await asyncio.to_thread(self.cache.get, url)
+        if page is not None and page.parser_version != PARSER_VERSION:
+            # Parser changed since the page was stored: re-parse the stored HTML, keep its validators
+            response = await self.parse(page.text, url)
+            page = replace(page, parser_version=PARSER_VERSION, response=response)
+            await asyncio.to_thread(self.cache.put, page)
+        return page
+
+    async def fetch(self, product_url: str, product_id: Optional[str] = None) -> ProductSourceResponse:
+        page = await self._cached_page(product_url)
+        if page is not None and page.is_fresh(self.ttl):
+            self._hits += 1
+            return _for_product(page.response, product_id)
+
+        if self._client is None:
+            await self.start()
+        headers = {}
+        if page is not None:
+            if page.etag:
+                headers["If-None-Match"] = page.etag
+            if page.last_modified:
+                headers["If-Modified-Since"] = page.last_modified
+        response = await self._client.get(product_url, headers=headers)
+
+        if response.status_code == 304 and page is not None:
+            self._revalidated += 1
+            page.etag = response.headers.get("etag", page.etag)
+            page.last_modified = response.headers.get("last-modified", page.last_modified)
+            await asyncio.to_thread(self.cache.touch, page, time.time())
+            return _for_product(page.response, product_id)
+
+        response.raise_for_status()
+        self._downloads += 1
+        html = response.text
+        parsed = await self.parse(html, product_url)
+        page = SourcePage(
+            url=product_url,
+            etag=response.headers.get("etag"),
+            last_modified=response.headers.get("last-modified"),
+            fetched_at=time.time(),
+            parser_version=PARSER_VERSION,
+            html=zlib.compress(html.encode("utf-8")),
+            response=parsed,
+        )
+        await asyncio.to_thread(self.cache.put, page)
+        return _for_product(parsed, product_id)
+
+    async def fetch_many(
+        self,
+        targets: List[Tuple[str, Optional[str]]],
+        concurrency: int = BATCH_CONCURRENCY,
+    ) -> AsyncIterator[Tuple[int, Union[ProductSourceResponse, Exception]]]:
+        """
+        Fetch (product_url, product_id) targets concurrently and yield
+        (index, response or exception) in completion order.
+
+        At most `concurrency` pages are fetched at a time and a URL listed
+        more than once is fetched once. Fetches still running when the
+        consumer stops iterating are cancelled.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        pages: Dict[str, asyncio.Future] = {}
+
+        async def fetch_page(url: str) -> ProductSourceResponse:
+            async with semaphore:
+                return await self.fetch(url)
+
+        async def fetch_target(index: int, url: str, product_id: Optional[str]):
+            try:
+                return index, _for_product(await pages[url], product_id)
+            except Exception as exc:
+                return index, exc
+
+        for url, _ in targets:
+            if url not in pages:
+                pages[url] = asyncio.ensure_future(fetch_page(url))
+        waiters = [asyncio.ensure_future(fetch_target(i, url, pid)) for i, (url, pid) in enumerate(targets)]
+        try:
+            for next_done in asyncio.as_completed(waiters):
+                yield await next_done
+        finally:
+            for task in (*waiters, *pages.values()):
+                task.cancel()
+
+
+# Singleton instance
+product_source_client = ProductSourceClient()
+
+
+async def fetch_product_source_async(product_url: str, product_id: Optional[str] = None) -> ProductSourceResponse:
+    return await product_source_client.fetch(product_url, product_id)
@@ -0,0 +1,201 @@
+"""
+Resolved product projection for the catalog snapshot
+ProductResolved JSON with fallback media URLs, built once per snapshot and overlaid with Storage API variants
+"""
+
+from __future__ import annotations
+
+import urllib.parse
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ..core.serialization import dumps_bytes
+from ..models.product import MediaItem, Product
+from ..models.resolved import (
+    ImageVariants,
+    LayoutHints,
+    MediaAsset,
+    MediaCollection,
+    PriceResolved,
+    ProductResolved,
+    VideoVariants,
+)
+
+
+STORAGE_MEDIA_URL = "https://api-storage.arkturian.com/storage/media"
+STORAGE_PROXY_URL = "https://api-storage.arkturian.com/storage/proxy"
+
+# Media roles that have a place in MediaCollection; other roles are not part of the resolved feed
+RESOLVED_ROLES = ("hero", "detail", "lifestyle")
+
+
+@dataclass
+class MediaSlot:
+    """Where a media item ends up in the resolved product's MediaCollection."""
+    link_id: str
+    role: str
+    alt: Optional[str]
+    # Position in media.detail / media.lifestyle; None for the hero
+    index: Optional[int] = None
+
+
+@dataclass
+class ResolvedEntry:
+    """Resolved projection of one product, aligned with snapshot positions."""
+    # ProductResolved as JSON data, media filled with fallback URLs
+    data: Dict[str, Any]
+    # `data` rendered once, served as-is when the Storage API knows none of the product's media
+    json: bytes
+    slots: List[MediaSlot] = field(default_factory=list)
+
+
+def _resolved_price(p: Product) -> Optional[PriceResolved]:
+    if not p.price or p.price.value is None:
+        return None
+    symbol = "€" if (p.price.currency or "EUR").upper() == "EUR" else p.price.currency
+    formatted = f"{symbol}{int(p.price.value) if p.price.value.is_integer() else p.price.value}"
+    return PriceResolved(value=p.price.value, currency=p.price.currency or "EUR", formatted=formatted)
+
+
+def _fallback_asset(m: MediaItem) -> MediaAsset:
+    """
+    Media asset served through the Storage API without variant data: the
+    media endpoint for stored objects, the proxy endpoint for external URLs.
+    """
+    src_url = str(m.src) if m.src else None
+    storage_id = getattr(m, "storage_id", None)
+
+    if storage_id:
+        base_url = f"{STORAGE_MEDIA_URL}/{storage_id}"
+        thumb_url = f"{base_url}?width=400&format=webp&quality=80"
+        preview_url = f"{base_url}?width=800&format=webp&quality=85"
+        print_url = f"{base_url}?width=2000&format=jpg&quality=95"
+    elif src_url:
+        encoded_url = urllib.parse.quote(src_url, safe="")
+        thumb_url = f"{STORAGE_PROXY_URL}?url={encoded_url}&width=400&format=webp&quality=80"
+        preview_url = f"{STORAGE_PROXY_URL}?url={encoded_url}&width=800&format=webp&quality=85"
+        print_url = f"{STORAGE_PROXY_URL}?url={encoded_url}&width=2000&format=jpg&quality=95"
+    else:
+        thumb_url = preview_url = print_url = None
+
+    return MediaAsset(
+        link_id=m.id,
+        role=m.role,
+        type="image",
+        alt=m.alt or f"{m.role.capitalize()} image",
+        width=800,
+        height=800,
+        aspectRatio=1.0,
+        variants=ImageVariants(thumb=thumb_url, preview=preview_url, print=print_url),
+        video=None,
+        original_filename=None,
+        mime_type="image/jpeg",
+        file_size_bytes=None,
+    )
+
+
+def variant_asset(slot: MediaSlot, asset_data: Dict[str, Any]) -> Dict[str, Any]:
+    """MediaAsset JSON data for a media item from its Storage API asset record."""
+    variants = None
+    video = None
+    if asset_data.get("type") == "image":
+        variants = ImageVariants(
+            thumb=asset_data.get("variants", {}).get("thumb"),
+            preview=asset_data.get("variants", {}).get("preview"),
+            print=asset_data.get("variants", {}).get("print"),
+        )
+    elif asset_data.get("type") == "video":
+        video = VideoVariants(
+            hls=asset_data.get("video", {}).get("hls"),
+            posterThumb=asset_data.get("video", {}).get("posterThumb"),
+            posterPreview=asset_data.get("video", {}).get("posterPreview"),
+            print=asset_data.get("video", {}).get("print"),
+        )
+    return MediaAsset(
+        link_id=slot.link_id,
+        role=slot.role,
+        type=asset_data.get("type", "image"),
+        alt=slot.alt,
+        width=asset_data.get("width"),
+        height=asset_data.get("height"),
+        aspectRatio=asset_data.get("aspectRatio"),
+        variants=variants,
+        video=video,
+        original_filename=asset_data.get("original_filename"),
+        mime_type=asset_data.get("mime_type"),
+        file_size_bytes=asset_data.get("file_size_bytes"),
+    ).model_dump()
+
+
+def _resolve_product(p: Product) -> ResolvedEntry:
+    media_collection = MediaCollection()
+    slots: List[MediaSlot] = []
+    hero_slot: Optional[MediaSlot] = None
+    for m in p.media or []:
+        if m.role not in RESOLVED_ROLES:
+            continue
+        asset = _fallback_asset(m)
+        if m.role == "hero":
+            # A later hero replaces an earlier one
+            media_collection.hero = asset
+            hero_slot = MediaSlot(link_id=m.id, role=m.role, alt=m.alt)
+            continue
+        assets = getattr(media_collection, m.role)
+        slots.append(MediaSlot(link_id=m.id, role=m.role, alt=m.alt, index=len(assets)))
+        assets.append(asset)
+
+    product_resolved = ProductResolved(
+        id=p.id,
+        sku=p.sku,
+        name=p.name,
+        brand=p.brand,
+        category=p.category,
+        season=p.season,
+        status=p.status,
+        certifications=p.certifications,
+        materials=p.materials,
+        colors=p.colors,
+        sizes=p.sizes,
+        price=_resolved_price(p),
+        media=media_collection,
+        layout=LayoutHints(),
+        meta=p.meta,
+        ai_tags=p.ai_tags,
+        ai_analysis=p.ai_analysis,
+    )
+    # Python-mode dump, as the JSONResponse this replaces used (keeps LayoutHints defaults as ints)
+    data = product_resolved.model_dump()
+    if hero_slot is not None:
+        slots.insert(0, hero_slot)
+    return ResolvedEntry(data=data, json=dumps_bytes(data), slots=slots)
+
+
+def build_resolved_projection(products: List[Product]) -> List[ResolvedEntry]:
+    return [_resolve_product(p) for p in products]
+
+
+def resolved_queries(entries: List[ResolvedEntry]) -> List[Dict[str, str]]:
+    """Storage API batch queries for every media item shown in the given entries."""
+    return [{"link_id": slot.link_id, "role": slot.role} for entry in entries for slot in entry.slots]
+
+
+def resolved_json(entry: ResolvedEntry, variants_map: Dict[str, Dict[str, Any]]) -> bytes:
+    """
+    The entry's JSON with Storage API variant data overlaid where available.
+
+    Only the media collection and the replaced assets are copied; the rest
+    of the precomputed data is shared.
+    """
+    found = [slot for slot in entry.slots if variants_map.get(slot.link_id)]
+    if not found:
+        return entry.json
+    media = dict(entry.data["media"])
+    for role in ("detail", "lifestyle"):
+        media[role] = list(media[role])
+    for slot in found:
+        asset = variant_asset(slot, variants_map[slot.link_id])
+        if slot.index is None:
+            media["hero"] = asset
+        else:
+            media[slot.role][slot.index] = asset
+    return dumps_bytes({**entry.data, "media": media})
@@ -0,0 +1,155 @@
+"""
+Full-text search index for the catalog snapshot
+Token index with German/English normalization, prefix matching and BM25 scoring
+"""
+
+from __future__ import annotations
+
+import math
+import re
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from ..models.product import Product
+
+
+# Field weights (BM25F-style: a term in the name counts more than one in the long description)
+FIELD_WEIGHTS: Dict[str, float] = {
+    "name": 3.0,
+    "sku": 2.0,
+    "category": 2.0,
+    "ai_tags": 1.5,
+    "keywords": 1.5,
+    "key_features": 1.2,
+    "description_short": 1.0,
+    "description_long": 1.0,
+    "id": 0.5,
+}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Prefix expansions score less than exact token hits
+PREFIX_PENALTY = 0.6
+
+_UMLAUT_FOLD = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def _strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """
+    Lowercase, fold German umlauts (ä -> ae, ß -> ss), strip other accents and
+    split on anything that is not a letter or digit.
+    """
+    if not text:
+        return []
+    folded = _strip_accents(text.casefold().translate(_UMLAUT_FOLD))
+    return _TOKEN_RE.findall(folded)
+
+
+def _index_tokens(text: Optional[str]) -> List[str]:
+    """
+    Tokens to index for a text: the umlaut-folded form plus, where it differs,
+    the plain-vowel form, so both "groesse" and "grosse" find "Größe".
+    """
+    tokens = tokenize(text)
+    if text and any(ch in text.casefold() for ch in "äöü"):
+        plain = _TOKEN_RE.findall(_strip_accents(text.casefold()).replace("ß", "ss"))
+        tokens.extend(t for t in plain if t not in tokens)
+    return tokens
+
+
+def _product_fields(p: Product) -> Iterable[Tuple[str, Optional[str]]]:
+    yield "name", p.name
+    yield "id", p.id
+    yield "sku", p.sku
+    yield "category", " ".join(p.category or [])
+    yield "ai_tags", " ".join(p.ai_tags or [])
+    yield "key_features", " ".join(p.key_features or [])
+    if p.description:
+        yield "description_short", p.description.short
+        yield "description_long", p.description.long
+    if p.ai_analysis and p.ai_analysis.keywords:
+        yield "keywords", " ".join(p.ai_analysis.keywords)
+
+
+class SearchIndex:
+    """
+    Inverted token index over catalog positions.
+
+    Each term maps to {position: weighted term frequency}. The vocabulary is
+    kept sorted so prefix (search-as-you-type) lookups are a bisect plus a
+    walk over the matching terms.
+    """
+
+    def __init__(self, products: List[Product]):
+        postings: Dict[str, Dict[int, float]] = {}
+        doc_lengths: List[float] = []
+
+        for pos, p in enumerate(products):
+            length = 0.0
+            for field_name, text in _product_fields(p):
+                weight = FIELD_WEIGHTS[field_name]
+                for token in _index_tokens(text):
+                    entry = postings.setdefault(token, {})
+                    entry[pos] = entry.get(pos, 0.0) + weight
+                    length += weight
+            doc_lengths.append(length)
+
+        self.size = len(products)
+        self.postings = postings
+        self.vocabulary: List[str] = sorted(postings)
+        self._doc_lengths = doc_lengths
+        self._avg_length = (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (self.size - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+
+    def _expand(self, token: str) -> List[str]:
+        """Vocabulary terms starting with `token` (the exact term first, if present)."""
+        terms: List[str] = []
+        i = bisect_left(self.vocabulary, token)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(token):
+            terms.append(self.vocabulary[i])
+            i += 1
+        return terms
+
+    def _bm25(self, term: str, pos: int, tf: float) -> float:
+        norm = 1 - BM25_B + BM25_B * (self._doc_lengths[pos] / self._avg_length if self._avg_length else 0.0)
+        return self._idf[term] * tf * (BM25_K1 + 1) / (tf + BM25_K1 * norm)
+
+    def search(self, query: str) -> Dict[int, float]:
+        """
+        Positions matching every query token (exactly or as a prefix), with BM25 scores.
+
+        An empty or token-less query matches nothing.
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return {}
+
+        scores: Optional[Dict[int, float]] = None
+        for token in tokens:
+            token_scores: Dict[int, float] = {}
+            for term in self._expand(token):
+                factor = 1.0 if term == token else PREFIX_PENALTY
+                for pos, tf in self.postings[term].items():
+                    if scores is not None and pos not in scores:
+                        continue
+                    score = factor * self._bm25(term, pos, tf)
+                    if score > token_scores.get(pos, 0.0):
+                        token_scores[pos] = score
+            if scores is None:
+                scores = token_scores
+            else:
+                scores = {pos: scores[pos] + s for pos, s in token_scores.items()}
+            if not scores:
+                return {}
+        return scores or {}
@@ -0,0 +1,192 @@
+"""
+Persistent cache for scraped product source pages
+SQLite store of page HTML, validators and parsed responses, with an in-memory LRU in front
+"""
+
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from ..models.product_source import ProductSourceResponse
+
+
+DATA_DIR = Path(__file__).resolve().parents[1] / "data"
+CACHE_DB = Path(os.getenv("PRODUCT_SOURCE_CACHE_DB", str(DATA_DIR / "product_source_cache.sqlite3")))
+# Seconds a cached page is served without asking oneal.eu; after that it is revalidated
+CACHE_TTL = float(os.getenv("PRODUCT_SOURCE_CACHE_TTL", "86400"))
+MEMORY_SIZE = int(os.getenv("PRODUCT_SOURCE_CACHE_MEMORY_SIZE", "512"))
+# Bounds of the SQLite store: at most MAX_ROWS pages, none older than MAX_AGE seconds (oldest go first)
+MAX_ROWS = int(os.getenv("PRODUCT_SOURCE_CACHE_MAX_ROWS", "5000"))
+MAX_AGE = float(os.getenv("PRODUCT_SOURCE_CACHE_MAX_AGE", str(30 * 86400)))
+# Inserts between two pruning passes
+PRUNE_EVERY = 100
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS source_pages (
+    url TEXT PRIMARY KEY,
+    etag TEXT,
+    last_modified TEXT,
+    fetched_at REAL NOT NULL,
+    parser_version INTEGER NOT NULL,
+    html BLOB NOT NULL,
+    response TEXT NOT NULL
+)
+"""
+_INDEX = "CREATE INDEX IF NOT EXISTS source_pages_fetched_at ON source_pages (fetched_at)"
+
+
+@dataclass
+class SourcePage:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    # Wall-clock time of the last download or successful revalidation
+    fetched_at: float
+    parser_version: int
+    html: bytes  # zlib-compressed page HTML
+    response: ProductSourceResponse
+
+    def is_fresh(self, ttl: float, now: Optional[float] = None) -> bool:
+        return (time.time() if now is None else now) - self.fetched_at < ttl
+
+    @property
+    def text(self) -> str:
+        return zlib.decompress(self.html).decode("utf-8")
+
+
+class SourceCache:
+    """
+    Product pages keyed by URL.
+
+    Lookups hit the in-memory LRU first and fall back to SQLite, so a
+    repeat lookup costs a dict access and pages survive restarts. Writes
+    go to both. The connection is shared between threads behind a lock;
+    the LRU has its own lock, as it is used from the event loop and from
+    worker threads alike. The store is pruned to `max_rows` pages no older
+    than `max_age` seconds.
+    """
+
+    def __init__(
+        self,
+        path: Path = CACHE_DB,
+        memory_size: int = MEMORY_SIZE,
+        max_rows: int = MAX_ROWS,
+        max_age: float = MAX_AGE,
+    ):
+        self.path = path
+        self.memory_size = memory_size
+        self.max_rows = max_rows
+        self.max_age = max_age
+        self._memory: "OrderedDict[str, SourcePage]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._inserts = 0
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+            conn.execute(_INDEX)
+            self._prune(conn)
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        """Drop pages older than max_age, then the oldest pages beyond max_rows. Caller holds the lock."""
+        conn.execute("DELETE FROM source_pages WHERE fetched_at < ?", (time.time() - self.max_age,))
+        (rows,) = conn.execute("SELECT COUNT(*) FROM source_pages").fetchone()
+        if rows > self.max_rows:
+            conn.execute(
+                "DELETE FROM source_pages WHERE url IN (SELECT url FROM source_pages ORDER BY fetched_at LIMIT ?)",
+                (rows - self.max_rows,),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _remember(self, page: SourcePage) -> None:
+        with self._memory_lock:
+            self._memory[page.url] = page
+            self._memory.move_to_end(page.url)
+            while len(self._memory) > self.memory_size:
+                self._memory.popitem(last=False)
+
+    def get_memory(self, url: str) -> Optional[SourcePage]:
+        with self._memory_lock:
+            page = self._memory.get(url)
+            if page is not None:
+                self._memory.move_to_end(url)
+            return page
+
+    def get(self, url: str) -> Optional[SourcePage]:
+        page = self.get_memory(url)
+        if page is not None:
+            return page
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT etag, last_modified, fetched_at, parser_version, html, response FROM source_pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, fetched_at, parser_version, html, response = row
+        page = SourcePage(
+            url=url,
+            etag=etag,
+            last_modified=last_modified,
+            fetched_at=fetched_at,
+            parser_version=parser_version,
+            html=html,
+            response=ProductSourceResponse.model_validate_json(response),
+        )
+        self._remember(page)
+        return page
+
+    def put(self, page: SourcePage) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO source_pages (url, etag, last_modified, fetched_at, parser_version, html, response) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    page.url,
+                    page.etag,
+                    page.last_modified,
+                    page.fetched_at,
+                    page.parser_version,
+                    page.html,
+                    page.response.model_dump_json(),
+                ),
+            )
+            self._inserts += 1
+            if self._inserts % PRUNE_EVERY == 0:
+                self._prune(conn)
+            conn.commit()
+        self._remember(page)
+
+    def touch(self, page: SourcePage, fetched_at: float) -> None:
+        """Record a successful revalidation (304): the stored page is current again."""
+        page.fetched_at = fetched_at
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE source_pages SET fetched_at = ?, etag = ?, last_modified = ? WHERE url = ?",
+                (fetched_at, page.etag, page.last_modified, page.url),
+            )
+            conn.commit()
+        self._remember(page)
@@ -0,0 +1,322 @@
+"""
+HTML extraction backends for product source pages
+selectolax or lxml when installed, BeautifulSoup as the fallback, plus a DOM-free JSON-LD scan
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from html import unescape
+from typing import Callable, Dict, Iterable, List, Optional
+
+from bs4 import BeautifulSoup
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:  # pragma: no cover - optional, depends on the environment
+    try:
+        # selectolax < 0.3 only has the Modest backend (removed in 1.0)
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+try:
+    import lxml.html as lxml_html
+except ImportError:  # pragma: no cover - optional, depends on the environment
+    lxml_html = None
+
+
+# bs4 until the other backends are verified against saved pages (scripts/benchmark_source_parsers.py);
+# "auto" opts in to the fastest installed one
+PARSER = os.getenv("PRODUCT_SOURCE_PARSER", "bs4").lower()
+
+DESCRIPTION_SELECTOR = (
+    "[data-product-description], .product__description, .product-single__description, #product-description"
+)
+COLLECTION_LINK_SELECTOR = 'a[href*="/collections/"]'
+
+# Elements whose text never counts as page text (BeautifulSoup's get_text skips them too)
+_NON_TEXT_TAGS = {"script", "style", "template"}
+
+_JSON_LD_RE = re.compile(
+    r"<script\b[^>]*\btype\s*=\s*[\"']?application/ld\+json[\"']?[^>]*>(.*?)</script\s*>",
+    re.IGNORECASE | re.DOTALL,
+)
+_TITLE_RE = re.compile(r"<title\b[^>]*>(.*?)</title\s*>", re.IGNORECASE | re.DOTALL)
+
+
+@dataclass
+class ExtractedPage:
+    """Everything parse_product_source needs from a page, independent of the parser used."""
+    schema: Optional[dict] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    features: List[str] = field(default_factory=list)
+    # Each table as rows of cell texts, rows without any text dropped
+    tables: List[List[List[str]]] = field(default_factory=list)
+    collections: List[str] = field(default_factory=list)
+
+
+def _schema_product(data) -> Optional[dict]:
+    # schema could be a dict or a list
+    if isinstance(data, dict) and data.get("@type") == "Product":
+        return data
+    if isinstance(data, list):
+        for item in data:
+            if isinstance(item, dict) and item.get("@type") == "Product":
+                return item
+    return None
+
+
+def extract_schema(html: str) -> Optional[dict]:
+    """
+    First schema.org Product in the page's JSON-LD blocks.
+
+    Scans the raw HTML for ld+json script elements and stops at the first
+    Product, without building a DOM.
+    """
+    for match in _JSON_LD_RE.finditer(html):
+        body = match.group(1)
+        if not body.strip():
+            continue
+        try:
+            data = json.loads(body)
+        except json.JSONDecodeError:
+            continue
+        product = _schema_product(data)
+        if product is not None:
+            return product
+    return None
+
+
+def extract_title(html: str) -> Optional[str]:
+    """Text of the first <title> element, without building a DOM."""
+    match = _TITLE_RE.search(html)
+    if not match:
+        return None
+    return unescape(match.group(1)).strip() or None
+
+
+def _features(item_texts: Iterable[str], paragraph_texts: Iterable[str]) -> List[str]:
+    """List items, then "Label: value" paragraphs, each text once."""
+    features: List[str] = []
+    seen = set()
+    for text in item_texts:
+        if text and text not in seen:
+            features.append(text)
+            seen.add(text)
+    for text in paragraph_texts:
+        if text and ":" in text and text not in seen:
+            features.append(text)
+            seen.add(text)
+    return features
+
+
+def _dedupe(values: Iterable[str]) -> List[str]:
+    return [v for v in dict.fromkeys(v for v in values if v)]
+
+
+def _dedupe_tables(tables: Iterable[List[List[str]]]) -> List[List[List[str]]]:
+    result: List[List[List[str]]] = []
+    seen = set()
+    for matrix in tables:
+        if not matrix:
+            continue
+        key = tuple(tuple(row) for row in matrix)
+        if key in seen:
+            continue
+        seen.add(key)
+        result.append(matrix)
+    return result
+
+
+# BeautifulSoup ------------------------------------------------------------------------------
+
+
+def extract_bs4(html: str) -> ExtractedPage:
+    soup = BeautifulSoup(html, "html.parser")
+    page = ExtractedPage(schema=extract_schema(html))
+    if soup.title:
+        page.title = soup.title.get_text(strip=True)
+
+    container = soup.select_one(DESCRIPTION_SELECTOR)
+    if container:
+        page.description = container.get_text(" ", strip=True) or None
+        page.features = _features(
+            (li.get_text(" ", strip=True) for li in container.find_all("li")),
+            (p.get_text(" ", strip=True) for p in container.find_all("p")),
+        )
+
+    page.tables = _dedupe_tables(
+        [
+            cells
+            for cells in (
+                [cell.get_text(" ", strip=True) for cell in row.find_all(["th", "td"])]
+                for row in table.find_all("tr")
+            )
+            if any(cells)
+        ]
+        for table in soup.select("table")
+    )
+    page.collections = _dedupe(link.get_text(strip=True) for link in soup.select(COLLECTION_LINK_SELECTOR))
+    return page
+
+
+# lxml (XPath, so cssselect is not needed) ---------------------------------------------------
+
+_LXML_DESCRIPTION = (
+    "//*[@data-product-description"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' product__description ')"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' product-single__description ')"
+    " or @id = 'product-description']"
+)
+
+
+def _lxml_strings(element) -> List[str]:
+    """
+    Stripped, non-empty text nodes below `element`, skipping comments and
+    script/style/template content, also when `element` itself is inside one.
+    """
+    if any(el.tag in _NON_TEXT_TAGS for el in (element, *element.iterancestors())):
+        return []
+    strings: List[str] = []
+
+    def walk(el) -> None:
+        if isinstance(el.tag, str) and el.tag.lower() in _NON_TEXT_TAGS:
+            return
+        if isinstance(el.tag, str) and el.text:
+            strings.append(el.text)
+        for child in el:
+            walk(child)
+            if child.tail:
+                strings.append(child.tail)
+
+    walk(element)
+    return [s.strip() for s in strings if s.strip()]
+
+
+def extract_lxml(html: str) -> ExtractedPage:
+    root = lxml_html.document_fromstring(html)
+    page = ExtractedPage(schema=extract_schema(html))
+    titles = root.xpath("(//title)[1]")
+    if titles:
+        page.title = "".join(_lxml_strings(titles[0]))
+
+    containers = root.xpath(_LXML_DESCRIPTION)
+    if containers:
+        container = containers[0]
+        page.description = " ".join(_lxml_strings(container)) or None
+        page.features = _features(
+            (" ".join(_lxml_strings(li)) for li in container.iter("li")),
+            (" ".join(_lxml_strings(p)) for p in container.iter("p")),
+        )
+
+    page.tables = _dedupe_tables(
+        [
+            cells
+            for cells in (
+                [" ".join(_lxml_strings(cell)) for cell in row.iter("th", "td")]
+                for row in table.iter("tr")
+            )
+            if any(cells)
+        ]
+        for table in root.iter("table")
+    )
+    page.collections = _dedupe(
+        "".join(_lxml_strings(link)) for link in root.xpath('//a[contains(@href, "/collections/")]')
+    )
+    return page
+
+
+# selectolax ---------------------------------------------------------------------------------
+
+
+def _selectolax_strings(node) -> List[str]:
+    """
+    Stripped, non-empty text nodes below `node` (its own subtree only),
+    skipping comments and script/style/template content.
+    """
+    ancestor = node
+    while ancestor is not None:
+        if ancestor.tag in _NON_TEXT_TAGS:
+            return []
+        ancestor = ancestor.parent
+    strings: List[str] = []
+
+    def walk(parent) -> None:
+        for child in parent.iter(include_text=True):
+            if child.tag == "-text":
+                text = child.text(deep=False).strip()
+                if text:
+                    strings.append(text)
+            elif not child.tag.startswith("-") and child.tag not in _NON_TEXT_TAGS:
+                walk(child)
+
+    walk(node)
+    return strings
+
+
+def extract_selectolax(html: str) -> ExtractedPage:
+    tree = HTMLParser(html)
+    page = ExtractedPage(schema=extract_schema(html))
+    title = tree.css_first("title")
+    if title is not None:
+        page.title = "".join(_selectolax_strings(title))
+
+    container = tree.css_first(DESCRIPTION_SELECTOR)
+    if container is not None:
+        page.description = " ".join(_selectolax_strings(container)) or None
+        page.features = _features(
+            (" ".join(_selectolax_strings(li)) for li in container.css("li")),
+            (" ".join(_selectolax_strings(p)) for p in container.css("p")),
+        )
+
+    page.tables = _dedupe_tables(
+        [
+            cells
+            for cells in (
+                [" ".join(_selectolax_strings(cell)) for cell in row.css("th, td")]
+                for row in table.css("tr")
+            )
+            if any(cells)
+        ]
+        for table in tree.css("table")
+    )
+    page.collections = _dedupe("".join(_selectolax_strings(link)) for link in tree.css(COLLECTION_LINK_SELECTOR))
+    return page
+
+
+# Backend selection --------------------------------------------------------------------------
+
+BACKENDS: Dict[str, Callable[[str], ExtractedPage]] = {"bs4": extract_bs4}
+if lxml_html is not None:
+    BACKENDS["lxml"] = extract_lxml
+if HTMLParser is not None:
+    BACKENDS["selectolax"] = extract_selectolax
+
+# Fastest first
+_PREFERENCE = ("selectolax", "lxml", "bs4")
+
+
+def backend_name(name: str = PARSER) -> str:
+    if name != "auto":
+        if name in BACKENDS:
+            return name
+        print(f"PRODUCT_SOURCE_PARSER={name} is not installed, falling back to bs4")
+        return "bs4"
+    return next(n for n in _PREFERENCE if n in BACKENDS)
+
+
+def extract_page(html: str, backend: Optional[str] = None) -> ExtractedPage:
+    return BACKENDS[backend or DEFAULT_BACKEND](html)
+
+
+def extract_schema_page(html: str) -> ExtractedPage:
+    """Schema data and title only, without building a DOM."""
+    return ExtractedPage(schema=extract_schema(html), title=extract_title(html))
+
+
+DEFAULT_BACKEND = backend_name()
@@ -3,17 +3,210 @@ Storage API Client for O'Neal Product API
 Handles batch resolution of media variants from Storage API
 """
 
+import asyncio
 import httpx
 import os
-from typing import Dict, List, Optional
-from functools import lru_cache
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+
+from .circuit_breaker import OPEN, CircuitBreaker
+from .variant_cache import VariantCache
+
+
+# Connection pool of the shared client
+MAX_CONNECTIONS = int(os.getenv("STORAGE_MAX_CONNECTIONS", "100"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("STORAGE_MAX_KEEPALIVE_CONNECTIONS", "20"))
+KEEPALIVE_EXPIRY = float(os.getenv("STORAGE_KEEPALIVE_EXPIRY", "30.0"))
+# HTTP/2 needs the optional `h2` package (pip install h2)
+HTTP2 = os.getenv("STORAGE_HTTP2", "false").lower() in ("1", "true", "yes")
+READ_TIMEOUT = float(os.getenv("STORAGE_READ_TIMEOUT", "10.0"))
+
+# Variant cache: entries per link_id, seconds to keep found assets and misses
+CACHE_SIZE = int(os.getenv("STORAGE_CACHE_SIZE", "20000"))
+CACHE_TTL = float(os.getenv("STORAGE_CACHE_TTL", "600"))
+CACHE_NEGATIVE_TTL = float(os.getenv("STORAGE_CACHE_NEGATIVE_TTL", "60"))
+# How long past its TTL an entry is still served (and refreshed in the background)
+CACHE_STALE_TTL = float(os.getenv("STORAGE_CACHE_STALE_TTL", "86400"))
+
+# Upstream batches: link_ids per POST and POSTs in flight per process
+BATCH_CHUNK_SIZE = int(os.getenv("STORAGE_BATCH_CHUNK_SIZE", "200"))
+BATCH_CONCURRENCY = int(os.getenv("STORAGE_BATCH_CONCURRENCY", "4"))
+
+# Circuit breaker: consecutive failed calls before opening, seconds before probing again
+BREAKER_FAILURES = int(os.getenv("STORAGE_BREAKER_FAILURES", "5"))
+BREAKER_RESET = float(os.getenv("STORAGE_BREAKER_RESET", "30"))
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
 
 
 class StorageClient:
+    """
+    Storage API client backed by one long-lived, pooled httpx.AsyncClient.
+
+    The client is opened in the app lifespan (or lazily on first use) and
+    closed on shutdown, so TCP/TLS connections are kept alive and reused
+    across requests.
+    """
+
     def __init__(self, base_url: str = None, api_key: str = None):
         self.base_url = base_url or os.getenv("STORAGE_API_URL", "https://api-storage.arkturian.com")
         self.api_key = api_key or os.getenv("STORAGE_API_KEY", "Inetpass1")
-        self.timeout = httpx.Timeout(connect=5.0, read=10.0, write=5.0, pool=5.0)
+        self.timeout = httpx.Timeout(connect=5.0, read=READ_TIMEOUT, write=5.0, pool=5.0)
+        self.limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        )
+        self.http2 = HTTP2
+        self._client: Optional[httpx.AsyncClient] = None
+        # Connection reuse: requests sent vs. new TCP connections opened
+        self._requests = 0
+        self._connections = 0
+        self.cache = VariantCache(CACHE_SIZE, CACHE_TTL, CACHE_NEGATIVE_TTL, CACHE_STALE_TTL)
+        self.breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET)
+        self._refreshes: Set[asyncio.Task] = set()
+        # link_id -> result of the upstream call currently resolving it (singleflight)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._coalesced = 0
+        self.chunk_size = max(BATCH_CHUNK_SIZE, 1)
+        self._batch_slots = asyncio.Semaphore(max(BATCH_CONCURRENCY, 1))
+        # (seconds, link_ids, ok) of recent chunk calls, for tuning the chunk size
+        self._chunk_log: deque = deque(maxlen=500)
+        self._chunks = 0
+        self._failed_chunks = 0
+
+    async def start(self) -> None:
+        if self._client is not None:
+            return
+        if self.http2 and not _http2_available():
+            print("STORAGE_HTTP2 is set but the h2 package is not installed, using HTTP/1.1")
+            self.http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=self.timeout,
+            limits=self.limits,
+            http2=self.http2,
+            headers={"X-API-Key": self.api_key},
+        )
+
+    async def aclose(self) -> None:
+        for task in list(self._refreshes):
+            task.cancel()
+        if self._refreshes:
+            await asyncio.gather(*self._refreshes, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            await self.start()
+        return self._client
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        """httpcore trace hook: counts requests sent and connections opened."""
+        if event_name == "connection.connect_tcp.complete":
+            self._connections += 1
+        elif event_name in ("http11.send_request_headers.started", "http2.send_request_headers.started"):
+            self._requests += 1
+
+    def stats(self) -> Dict[str, Any]:
+        reuse = 1 - self._connections / self._requests if self._requests else None
+        return {
+            "http2": self.http2,
+            "requests": self._requests,
+            "connections_opened": self._connections,
+            "connection_reuse_rate": round(max(reuse, 0.0), 4) if reuse is not None else None,
+            "cache": {**self.cache.stats(), "coalesced": self._coalesced, "inflight": len(self._inflight)},
+            "batches": self._chunk_stats(),
+            "breaker": self.breaker.stats(),
+            "background_refreshes": len(self._refreshes),
+        }
+
+    def _chunk_stats(self) -> Dict[str, Any]:
+        latencies = sorted(seconds for seconds, _, _ in self._chunk_log)
+
+        def pct(q: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(int(q * len(latencies)), len(latencies) - 1)] * 1000, 1)
+
+        return {
+            "chunk_size": self.chunk_size,
+            "concurrency": BATCH_CONCURRENCY,
+            "chunks": self._chunks,
+            "failed_chunks": self._failed_chunks,
+            "avg_link_ids": round(sum(n for _, n, _ in self._chunk_log) / len(self._chunk_log), 1)
+            if self._chunk_log else None,
+            "latency_ms": {"p50": pct(0.5), "p95": pct(0.95), "max": pct(1.0)},
+        }
+
+    def _record_failure(self) -> None:
+        was_open = self.breaker.state == OPEN
+        self.breaker.record_failure()
+        if not was_open and self.breaker.state == OPEN:
+            print(f"Storage API circuit opened, skipping calls for {self.breaker.reset_timeout:g}s")
+
+    async def _fetch_batch(self, queries: List[Dict[str, str]]) -> Optional[Dict[str, Dict]]:
+        """POST one batch to the Storage API; None if the call failed."""
+        client = await self._get_client()
+        try:
+            response = await client.post(
+                "/storage/asset-refs/batch",
+                json={"queries": queries},
+                extensions={"trace": self._trace},
+            )
+            response.raise_for_status()
+            data = response.json()
+            self.breaker.record_success()
+            return data.get("results", {})
+        except httpx.HTTPStatusError as e:
+            print(f"Storage API HTTP error: {e.response.status_code} - {e.response.text}")
+            # A 4xx means the Storage API is up and rejected this request
+            if e.response.status_code >= 500:
+                self._record_failure()
+            else:
+                self.breaker.record_success()
+        except httpx.RequestError as e:
+            print(f"Storage API request error: {e!r}")
+            self._record_failure()
+        except Exception as e:
+            print(f"Storage API unexpected error: {e}")
+            self._record_failure()
+        return None
+
+    async def _fetch_chunk(self, queries: List[Dict[str, str]]) -> Optional[Dict[str, Dict]]:
+        """
+        _fetch_batch() under the concurrency limit, recording the chunk's latency.
+
+        Returns None right away while the circuit breaker is open.
+        """
+        if not self.breaker.allow():
+            return None
+        try:
+            async with self._batch_slots:
+                started = time.perf_counter()
+                results = await self._fetch_batch(queries)
+                elapsed = time.perf_counter() - started
+        except asyncio.CancelledError:
+            # Neither success nor failure; without this a cancelled half-open probe would block every later call
+            self.breaker.record_cancel()
+            raise
+        self._chunks += 1
+        if results is None:
+            self._failed_chunks += 1
+        self._chunk_log.append((elapsed, len(queries), results is not None))
+        return results
+
+    def _chunked(self, queries: List[Dict[str, str]]) -> List[List[Dict[str, str]]]:
+        return [queries[i : i + self.chunk_size] for i in range(0, len(queries), self.chunk_size)]
 
     async def get_variants_batch(self, queries: List[Dict[str, str]]) -> Dict[str, Dict]:
         """
@@ -38,29 +231,116 @@ class StorageClient:
         """
         if not queries:
             return {}
+        results: Dict[str, Dict] = {}
+        for chunk_results in await asyncio.gather(*(self._fetch_chunk(c) for c in self._chunked(queries))):
+            results.update(chunk_results or {})
+        return results
+
+    async def _resolve(self, queries: List[Dict[str, str]], results: Dict[str, Dict]) -> None:
+        """Fetch link_ids registered in `_inflight`, chunk by chunk, into the cache and `results`."""
+        try:
+            await asyncio.gather(*(self._resolve_chunk(chunk, results) for chunk in self._chunked(queries)))
+        finally:
+            # Cancelled or failed before a chunk finished: release its waiters without caching
+            for query in queries:
+                future = self._inflight.pop(query["link_id"], None)
+                if future is not None and not future.done():
+                    future.set_result(None)
+
+    async def _resolve_chunk(self, queries: List[Dict[str, str]], results: Dict[str, Dict]) -> None:
+        """Fetch one chunk of uncached link_ids, cache the outcome and wake up waiting requests."""
+        fetched = await self._fetch_chunk(queries)
+        for query in queries:
+            link_id = query["link_id"]
+            value = fetched.get(link_id) if fetched is not None else None
+            if fetched is not None:
+                self.cache.put(link_id, value)
+            future = self._inflight.pop(link_id, None)
+            if future is not None and not future.done():
+                future.set_result(value)
+            if value is not None:
+                results[link_id] = value
+
+    async def prefetch(self, queries: List[Dict[str, str]], min_ttl: float = 0.0) -> int:
+        """
+        Load link_ids into the variant cache ahead of requests.
+
+        Link_ids that are cached and stay fresh for at least `min_ttl` more
+        seconds, or that are already being fetched, are skipped. Returns the
+        number of link_ids requested upstream.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + min_ttl
+        to_fetch: Dict[str, Dict[str, str]] = {}
+        for query in queries:
+            link_id = query["link_id"]
+            if link_id in to_fetch or link_id in self._inflight:
+                continue
+            entry = self.cache.peek(link_id)
+            if entry is not None and entry.expires_at > deadline:
+                continue
+            to_fetch[link_id] = query
+            self._inflight[link_id] = loop.create_future()
+        if to_fetch:
+            await self._resolve(list(to_fetch.values()), {})
+        return len(to_fetch)
+
+    async def get_variants_batch_cached(self, queries: List[Dict[str, str]]) -> Dict[str, Dict]:
+        """
+        get_variants_batch() through the variant cache.
 
-        url = f"{self.base_url}/storage/asset-refs/batch"
-        payload = {"queries": queries}
-
-        async with httpx.AsyncClient(timeout=self.timeout) as client:
-            try:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers={"X-API-Key": self.api_key, "Content-Type": "application/json"}
-                )
-                response.raise_for_status()
-                data = response.json()
-                return data.get("results", {})
-            except httpx.HTTPStatusError as e:
-                print(f"Storage API HTTP error: {e.response.status_code} - {e.response.text}")
-                return {}
-            except httpx.RequestError as e:
-                print(f"Storage API request error: {e}")
-                return {}
-            except Exception as e:
-                print(f"Storage API unexpected error: {e}")
-                return {}
+        Only link_ids that are neither cached nor already being fetched go
+        upstream, in chunks of `chunk_size` sent concurrently. Concurrent
+        callers asking for the same link_id wait for the call in flight
+        instead of sending their own. A failed chunk is not cached; its
+        link_ids are simply left out of the result, so callers fall back
+        for those assets only.
+
+        Expired entries within the stale window are returned as they are
+        and refreshed in the background, so a slow or unavailable Storage
+        API does not add latency for assets seen before.
+        """
+        results: Dict[str, Dict] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        to_fetch: Dict[str, Dict[str, str]] = {}
+        loop = asyncio.get_running_loop()
+
+        stale: Dict[str, Dict[str, str]] = {}
+        now = time.monotonic()
+
+        for query in queries:
+            link_id = query["link_id"]
+            if link_id in results or link_id in waiting or link_id in to_fetch or link_id in stale:
+                continue
+            entry = self.cache.get(link_id, now)
+            if entry is not None:
+                if entry.value is not None:
+                    results[link_id] = entry.value
+                if not entry.is_fresh(now) and link_id not in self._inflight:
+                    stale[link_id] = query
+            elif link_id in self._inflight:
+                waiting[link_id] = self._inflight[link_id]
+                self._coalesced += 1
+            else:
+                to_fetch[link_id] = query
+                self._inflight[link_id] = loop.create_future()
+
+        if stale:
+            for link_id in stale:
+                self._inflight[link_id] = loop.create_future()
+            task = asyncio.create_task(self._resolve(list(stale.values()), {}))
+            self._refreshes.add(task)
+            task.add_done_callback(self._refreshes.discard)
+
+        if to_fetch:
+            await self._resolve(list(to_fetch.values()), results)
+
+        for link_id, future in waiting.items():
+            # shield: a cancelled waiter must not cancel the shared result for the others
+            value = await asyncio.shield(future)
+            if value is not None:
+                results[link_id] = value
+        return results
 
     async def get_variants(self, link_id: str, role: Optional[str] = None) -> Optional[Dict]:
         """
@@ -85,19 +365,7 @@ class StorageClient:
 storage_client = StorageClient()
 
 
-# Optional: Add caching for frequently accessed assets
-@lru_cache(maxsize=500)
-def _cache_key(link_ids_tuple: tuple) -> str:
-    """Generate cache key from sorted link_ids"""
-    return "|".join(sorted(link_ids_tuple))
-
-
 async def get_variants_batch_cached(link_ids: List[str]) -> Dict[str, Dict]:
-    """
-    Cached version of batch variants lookup.
-    Cache expires when process restarts (good enough for v1).
-    """
-    # For now, just pass through to non-cached version
-    # In production, you could implement Redis caching here
+    """Cached batch variants lookup by link_id (see StorageClient.get_variants_batch_cached)."""
     queries = [{"link_id": link_id} for link_id in link_ids]
-    return await storage_client.get_variants_batch(queries)
+    return await storage_client.get_variants_batch_cached(queries)
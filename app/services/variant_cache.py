@@ -0,0 +1,93 @@
+"""
+Variant cache for the Storage API client
+Size-bounded LRU of resolved media assets per link_id, with TTLs for hits and misses and a stale window
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class CacheEntry:
+    # None records that the Storage API has no asset for the link_id
+    value: Optional[Dict]
+    expires_at: float
+    # Past expires_at the entry may still be served while it is being refreshed
+    stale_until: float
+
+    def is_fresh(self, now: float) -> bool:
+        return now < self.expires_at
+
+
+class VariantCache:
+    """
+    LRU cache of Storage API asset data keyed by link_id.
+
+    Found assets are fresh for `ttl` seconds, misses (link_ids the Storage
+    API does not know) for `negative_ttl`. An expired entry stays usable as
+    last-known-good data for another `stale_ttl` seconds, so it can be
+    served while a refresh runs or the Storage API is down; after that it
+    is dropped on access. When full, the least recently used entry is
+    evicted.
+    """
+
+    def __init__(self, max_size: int, ttl: float, negative_ttl: float, stale_ttl: float = 0.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, link_id: str, now: Optional[float] = None) -> Optional[CacheEntry]:
+        """Fresh or stale entry for `link_id`, or None; entry.value is None for a cached miss."""
+        entry = self._entries.get(link_id)
+        now = time.monotonic() if now is None else now
+        if entry is not None and entry.stale_until <= now:
+            del self._entries[link_id]
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(link_id)
+        if entry.is_fresh(now):
+            self.hits += 1
+        else:
+            self.stale_hits += 1
+        return entry
+
+    def peek(self, link_id: str) -> Optional[CacheEntry]:
+        """Entry for `link_id` (fresh or stale) without touching LRU order or statistics."""
+        return self._entries.get(link_id)
+
+    def put(self, link_id: str, value: Optional[Dict], now: Optional[float] = None) -> None:
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if ttl <= 0 or self.max_size <= 0:
+            return
+        now = time.monotonic() if now is None else now
+        self._entries[link_id] = CacheEntry(value=value, expires_at=now + ttl, stale_until=now + ttl + self.stale_ttl)
+        self._entries.move_to_end(link_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
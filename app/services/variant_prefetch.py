@@ -0,0 +1,80 @@
+"""
+Background prefetch of Storage API variants
+Keeps the variant cache warm for every media item of the current catalog snapshot
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from .catalog import POLL_INTERVAL, catalog
+from .resolved_projection import resolved_queries
+from .storage_client import storage_client
+
+
+PREFETCH_ENABLED = os.getenv("STORAGE_PREFETCH", "true").lower() in ("1", "true", "yes")
+# Seconds between scheduled refreshes; entries expiring before the next one are re-fetched
+PREFETCH_INTERVAL = float(os.getenv("STORAGE_PREFETCH_INTERVAL", "300"))
+
+
+class VariantPrefetcher:
+    """
+    Resolves the link_ids of every resolved-feed media item of the current
+    snapshot into the variant cache: right after a snapshot is published,
+    and again every `interval` seconds for entries that would otherwise
+    expire before the next run.
+    """
+
+    def __init__(self, interval: float = PREFETCH_INTERVAL):
+        self.interval = interval
+        self._version: Optional[int] = None
+        self._last_run = 0.0
+        self._stats: Dict[str, Any] = {}
+
+    async def run_once(self) -> int:
+        snapshot = catalog.get()
+        queries = resolved_queries(snapshot.resolved)
+        if len(queries) > storage_client.cache.max_size:
+            print(
+                f"Variant prefetch: {len(queries)} link_ids exceed STORAGE_CACHE_SIZE "
+                f"({storage_client.cache.max_size}), the cache cannot hold them all"
+            )
+        started = time.perf_counter()
+        # Refresh whatever would expire before the next scheduled run
+        fetched = await storage_client.prefetch(queries, min_ttl=self.interval)
+        elapsed = time.perf_counter() - started
+        self._version = snapshot.version
+        self._last_run = time.monotonic()
+        self._stats = {
+            "catalog_version": snapshot.version,
+            "finished_at": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "seconds": round(elapsed, 3),
+            "link_ids": len(queries),
+            "fetched": fetched,
+        }
+        if fetched:
+            print(f"Variant prefetch: {fetched}/{len(queries)} link_ids fetched in {elapsed:.2f}s")
+        return fetched
+
+    async def run(self, poll_interval: float = POLL_INTERVAL) -> None:
+        """Prefetch on every new catalog version and on the refresh schedule."""
+        while True:
+            snapshot = catalog.get()
+            due = time.monotonic() - self._last_run >= self.interval
+            if snapshot.version != self._version or due:
+                try:
+                    await self.run_once()
+                except Exception as e:
+                    print(f"Variant prefetch failed: {e}")
+                    self._version = snapshot.version
+                    self._last_run = time.monotonic()
+            await asyncio.sleep(poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": PREFETCH_ENABLED, "interval": self.interval, "last_run": self._stats or None}
+
+
+# Singleton instance
+variant_prefetcher = VariantPrefetcher()
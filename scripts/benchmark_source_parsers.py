@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark the product source extraction backends on saved product pages.
+
+Every installed backend (selectolax, lxml, bs4) and the DOM-free schema-only
+scan parse each fixture page; the script reports the mean parse time per page
+and whether each backend's response matches the BeautifulSoup reference.
+
+Fixtures are plain HTML files. scripts/fixtures/source_pages holds a few
+small pages covering the edge cases; real pages can be saved with --save:
+    python scripts/benchmark_source_parsers.py --check
+    python scripts/benchmark_source_parsers.py --save 20 --fixtures /tmp/source_pages
+
+With --check the script exits with status 1 if any backend differs from bs4.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.services.product_source import _fetch_html, parse_product_source
+from app.services.source_extract import BACKENDS, DEFAULT_BACKEND
+
+DATA_FILE = ROOT / "app" / "data" / "products.json"
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures" / "source_pages"
+
+
+def save_fixtures(directory: Path, count: int) -> None:
+    """Download the product pages of the first `count` products with a product_url."""
+    directory.mkdir(parents=True, exist_ok=True)
+    products = json.loads(DATA_FILE.read_text(encoding="utf-8"))
+    saved = 0
+    for product in products:
+        if saved >= count:
+            break
+        url = (product.get("meta") or {}).get("product_url")
+        if not url:
+            continue
+        try:
+            html = _fetch_html(url)
+        except Exception as exc:  # pragma: no cover - network errors
+            print(f"❌ {product.get('id')}: {exc}")
+            continue
+        (directory / f"{product.get('id')}.html").write_text(html, encoding="utf-8")
+        saved += 1
+        print(f"💾 {product.get('id')}: {len(html) / 1024:.0f} KB")
+    print(f"Saved {saved} page(s) to {directory}")
+
+
+def _time(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return statistics.mean(timings)
+
+
+def _differences(result, reference, fields) -> List[str]:
+    ours = result.model_dump(include=fields)
+    theirs = reference.model_dump(include=fields)
+    return [f"{name}: {ours.get(name)!r} != bs4 {theirs.get(name)!r}" for name in sorted(fields) if ours.get(name) != theirs.get(name)]
+
+
+def benchmark(directory: Path, repeat: int) -> bool:
+    """Print timings and parity per backend; True if every backend matches bs4 on every page."""
+    pages = sorted(directory.glob("*.html"))
+    if not pages:
+        print(f"No *.html fixtures in {directory}")
+        return False
+
+    url = "https://fixture.invalid/products/page"
+    modes = [(name, {"backend": name}) for name in ("selectolax", "lxml", "bs4") if name in BACKENDS]
+    modes.append(("schema-only", {"schema_only": True}))
+    totals = {name: 0.0 for name, _ in modes}
+    mismatches = {name: [] for name, _ in modes}
+
+    for path in pages:
+        html = path.read_text(encoding="utf-8")
+        reference = parse_product_source(html, url, backend="bs4")
+        for name, kwargs in modes:
+            totals[name] += _time(lambda: parse_product_source(html, url, **kwargs), repeat)
+            result = parse_product_source(html, url, **kwargs)
+            if name == "schema-only":
+                # Only the schema-derived fields are expected to match
+                fields = {"title", "brand", "price", "currency", "availability", "offers", "raw_schema"}
+            else:
+                fields = set(type(reference).model_fields)
+            differences = _differences(result, reference, fields)
+            if differences:
+                mismatches[name].append(path.name)
+                for difference in differences:
+                    print(f"  {name} {path.name} {difference}")
+
+    print(f"{len(pages)} page(s), {repeat} run(s) each, default backend: {DEFAULT_BACKEND}")
+    print(f"{'backend':<12} {'ms/page':>9} {'speedup':>8}  matches bs4")
+    baseline = totals["bs4"] / len(pages)
+    for name, _ in modes:
+        per_page = totals[name] / len(pages)
+        differing = mismatches[name]
+        match = "yes" if not differing else f"no ({len(differing)}: {', '.join(differing[:5])})"
+        print(f"{name:<12} {per_page * 1000:>9.2f} {baseline / per_page:>7.1f}x  {match}")
+
+    missing = [name for name in ("selectolax", "lxml") if name not in BACKENDS]
+    if missing:
+        print(f"Not installed: {', '.join(missing)}")
+    return not any(mismatches.values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark product source extraction backends")
+    parser.add_argument("--fixtures", default=str(FIXTURES_DIR), help="Directory of saved product page HTML files")
+    parser.add_argument("--repeat", type=int, default=5, help="Parses per page and backend")
+    parser.add_argument("--save", type=int, metavar="N", help="Download N product pages into --fixtures first")
+    parser.add_argument("--check", action="store_true", help="Exit with status 1 if a backend differs from bs4")
+    args = parser.parse_args()
+
+    directory = Path(args.fixtures)
+    if args.save:
+        save_fixtures(directory, args.save)
+    matches = benchmark(directory, args.repeat)
+    if args.check and not matches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,45 @@
 #!/usr/bin/env python3
-"""Populate derived product information (taxonomy, variants, features) from official O'Neal product pages."""
+"""Populate derived product information (taxonomy, variants, features) from official O'Neal product pages.
+
+- Fetches the product pages concurrently (--concurrency) with a per-host rate limit (--rate requests/second)
+- Retries timeouts, connection errors, 429 and 5xx responses with exponential backoff (--retries)
+- Pages are parsed in a process pool (--parse-executor) and go through the product source cache;
+  unchanged pages are revalidated with a 304 and not re-parsed
+- products.json is saved every --save-every products; the ids saved so far are appended to a checkpoint
+  file, so an interrupted run resumes where it stopped (--restart ignores the checkpoint)
+
+Usage:
+    python scripts/update_products_from_source.py --concurrency 16 --rate 8
+"""
 
 from __future__ import annotations
 
+import argparse
+import asyncio
 import json
+import os
+import random
+import statistics
 import sys
+import time
 from pathlib import Path
+from typing import Dict, List, Optional, Set
+from urllib.parse import urlsplit
+
+import httpx
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
-from app.services.product_source import fetch_product_source
+from app.models.product_source import ProductSourceResponse
+from app.services.product_source import ProductSourceClient
 
 DATA_FILE = Path(__file__).resolve().parents[1] / "app" / "data" / "products.json"
+CHECKPOINT_FILE = DATA_FILE.with_name("update_products_from_source.checkpoint")
 
 
-def update_product(product: dict) -> None:
-    meta = product.setdefault("meta", {})
-    product_url = meta.get("product_url")
-    if not product_url:
-        print(f"⚠️  {product.get('id')}: no product_url in metadata, skipping")
-        return
-
-    try:
-        source = fetch_product_source(product_url, product.get("id"))
-    except Exception as exc:  # pragma: no cover - network errors
-        print(f"❌ {product.get('id')}: failed to fetch source info ({exc})")
-        return
-
+def apply_source(product: dict, source: ProductSourceResponse) -> None:
     product["source_url"] = source.source_url
 
     if source.features:
@@ -50,12 +61,186 @@ def update_product(product: dict) -> None:
         product["derived_taxonomy"] = taxonomy.model_dump(exclude_none=True)
 
 
+class HostRateLimiter:
+    """Spaces requests to the same host at least 1/rate seconds apart."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def wait(self, url: str) -> None:
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        async with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, 0.0))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _retry_delay(exc: Exception, attempt: int, backoff: float) -> Optional[float]:
+    """Seconds to wait before retrying after `exc`, or None if it is not worth retrying."""
+    if isinstance(exc, httpx.HTTPStatusError):
+        status = exc.response.status_code
+        if status != 429 and status < 500:
+            return None
+        retry_after = exc.response.headers.get("retry-after", "")
+        if retry_after.isdigit():
+            return float(retry_after)
+    elif not isinstance(exc, httpx.TransportError):
+        return None
+    delay = min(backoff * 2 ** attempt, 60.0)
+    return delay + random.uniform(0, delay / 2)
+
+
+class BulkUpdater:
+    def __init__(self, products: List[dict], args: argparse.Namespace):
+        self.products = products
+        self.args = args
+        self.client = ProductSourceClient(
+            ttl=args.max_age,
+            parse_executor=args.parse_executor,
+            parse_workers=args.parse_workers,
+        )
+        self.limiter = HostRateLimiter(args.rate)
+        self.checkpoint = Path(args.checkpoint)
+        self.done: Set[str] = set()
+        # Updated since the last save; checkpointed once products.json containing them is written
+        self._unsaved: List[str] = []
+        self._save_lock = asyncio.Lock()
+        self.timings: List[float] = []
+        self.failed: Dict[str, str] = {}
+        self.retries = 0
+
+    def load_checkpoint(self) -> None:
+        if not self.checkpoint.exists():
+            return
+        if self.args.restart:
+            self.checkpoint.unlink()
+            return
+        self.done = {line.strip() for line in self.checkpoint.read_text(encoding="utf-8").splitlines() if line.strip()}
+        if self.done:
+            print(f"↩️  Resuming: {len(self.done)} products already updated ({self.checkpoint})")
+
+    async def save(self) -> None:
+        async with self._save_lock:
+            if not self._unsaved:
+                return
+            ids, self._unsaved = self._unsaved, []
+            # Serialize on the event loop: update() keeps changing the product dicts while the file is written
+            data = json.dumps(self.products, indent=2, ensure_ascii=False) + "\n"
+            await asyncio.to_thread(self._write, data, ids)
+
+    def _write(self, data: str, ids: List[str]) -> None:
+        tmp = DATA_FILE.with_suffix(".json.tmp")
+        tmp.write_text(data, encoding="utf-8")
+        tmp.replace(DATA_FILE)
+        with self.checkpoint.open("a", encoding="utf-8") as fh:
+            fh.write("".join(f"{product_id}\n" for product_id in ids))
+
+    async def fetch(self, product_url: str, product_id: Optional[str]) -> ProductSourceResponse:
+        attempt = 0
+        while True:
+            await self.limiter.wait(product_url)
+            try:
+                return await self.client.fetch(product_url, product_id)
+            except Exception as exc:
+                delay = _retry_delay(exc, attempt, self.args.backoff)
+                if delay is None or attempt >= self.args.retries:
+                    raise
+                attempt += 1
+                self.retries += 1
+                print(f"🔁 {product_id}: {exc.__class__.__name__}, retry {attempt}/{self.args.retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    async def update(self, product: dict, semaphore: asyncio.Semaphore) -> None:
+        product_id = product.get("id")
+        product_url = product["meta"]["product_url"]
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                source = await self.fetch(product_url, product_id)
+            except Exception as exc:  # pragma: no cover - network errors
+                self.failed[product_id] = str(exc) or exc.__class__.__name__
+                print(f"❌ {product_id}: failed to fetch source info ({exc})")
+                return
+            self.timings.append(time.perf_counter() - started)
+        apply_source(product, source)
+        self._unsaved.append(product_id)
+        if len(self._unsaved) >= self.args.save_every:
+            await self.save()
+
+    async def run(self) -> None:
+        self.load_checkpoint()
+        pending = []
+        no_url = 0
+        for product in self.products:
+            if not (product.get("meta") or {}).get("product_url"):
+                no_url += 1
+                print(f"⚠️  {product.get('id')}: no product_url in metadata, skipping")
+                continue
+            if product.get("id") in self.done:
+                continue
+            pending.append(product)
+
+        started = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        try:
+            await asyncio.gather(*(self.update(product, semaphore) for product in pending))
+        finally:
+            await self.save()
+            await self.client.aclose()
+        elapsed = time.perf_counter() - started
+
+        updated = len(pending) - len(self.failed)
+        print()
+        print(f"✅ Updated {updated} products with source information in {elapsed:.1f}s")
+        print(f"   resumed (already done): {len(self.done)}, no product_url: {no_url}, failed: {len(self.failed)}, retries: {self.retries}")
+        stats = self.client.stats()
+        print(f"   pages: {stats['downloads']} downloaded, {stats['revalidated']} unchanged (304), {stats['cache_hits']} from cache")
+        if self.timings:
+            ordered = sorted(self.timings)
+            p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+            print(
+                f"   per product: mean {statistics.mean(ordered):.2f}s, p50 {statistics.median(ordered):.2f}s, "
+                f"p95 {p95:.2f}s, max {ordered[-1]:.2f}s"
+            )
+        if self.failed:
+            print(f"   rerun to retry the {len(self.failed)} failed products; completed ones are skipped")
+        elif self.checkpoint.exists():
+            # Everything is in products.json; the next run starts from scratch
+            self.checkpoint.unlink()
+
+
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Update products.json from the official O'Neal product pages")
+    parser.add_argument("--concurrency", type=int, default=16, help="Products fetched at the same time")
+    parser.add_argument("--rate", type=float, default=8.0, help="Max requests per second per host (0 = unlimited)")
+    parser.add_argument("--retries", type=int, default=3, help="Retries per product for transient errors")
+    parser.add_argument("--backoff", type=float, default=1.0, help="First retry delay in seconds, doubled per retry")
+    parser.add_argument(
+        "--max-age",
+        type=float,
+        default=0.0,
+        help="Use cached pages younger than this many seconds without asking oneal.eu (default: always revalidate)",
+    )
+    parser.add_argument(
+        "--parse-executor",
+        choices=("process", "thread"),
+        default="process",
+        help="Parse pages in worker processes (default, uses every core) or threads",
+    )
+    parser.add_argument("--parse-workers", type=int, default=os.cpu_count() or 1, help="Parser pool size")
+    parser.add_argument("--save-every", type=int, default=50, help="Save products.json after this many updates")
+    parser.add_argument("--checkpoint", default=str(CHECKPOINT_FILE), help="File of product ids already updated")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and update every product")
+    args = parser.parse_args()
+
     products = json.loads(DATA_FILE.read_text(encoding="utf-8"))
-    for product in products:
-        update_product(product)
-    DATA_FILE.write_text(json.dumps(products, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
-    print(f"✅ Updated {len(products)} products with source information")
+    asyncio.run(BulkUpdater(products, args).run())
 
 
 if __name__ == "__main__":